@@ -10,7 +10,11 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from habit.scheduler import start_background_jobs
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Habit_Tracker.settings')
 
 application = get_asgi_application()
+
+# Only the serving process runs the in-process background jobs
+start_background_jobs()
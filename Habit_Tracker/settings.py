@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'habit.profiling.ProfilingMiddleware',
+    'habit.queries.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +89,17 @@ if os.path.exists('local_settings.py'):
 else:
     from .local_settings import DATABASES
 
+# Connection reuse. The pooled engines of habit.db.backends (MySQL and SQLite)
+# return connections to a per-process pool at the end of every request, which
+# needs CONN_MAX_AGE at 0, and check them on checkout with the HEALTH_CHECKS of
+# their POOL. Other engines keep Django's connection settings.
+for _database in DATABASES.values():
+    if _database.get('ENGINE', '').startswith('habit.db.backends.'):
+        _database.setdefault('CONN_MAX_AGE', 0)
+
+# Sends the analytics reads to the HABIT_ANALYTICS_REPLICA database when it is set
+DATABASE_ROUTERS = ['habit.routers.AnalyticsReplicaRouter']
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -136,3 +149,94 @@ CRISPY_TEMPLATE_PACK = 'bootstrap5'
 LOGIN_REDIRECT_URL = 'habit-home'
 LOGIN_URL = 'login'
 
+
+# Number of TaskTracker rows written per INSERT when a habit's tasks are created
+HABIT_TASK_BATCH_SIZE = 500
+
+# Number of overdue tasks failed per UPDATE on backends without UPDATE ... RETURNING
+HABIT_SWEEP_BATCH_SIZE = 1000
+
+# Overdue-task sweep. HABIT_SWEEP_ON_REQUEST keeps the sweep on every home page
+# view; turn it off once `manage.py sweep_overdue_tasks` or the in-process
+# scheduler (HABIT_SWEEP_IN_PROCESS) runs the sweep in the background.
+HABIT_SWEEP_ON_REQUEST = True
+HABIT_SWEEP_IN_PROCESS = False
+HABIT_SWEEP_INTERVAL = 300
+HABIT_SWEEP_SHARD = int(os.environ.get('HABIT_SWEEP_SHARD', 0))
+HABIT_SWEEP_SHARDS = int(os.environ.get('HABIT_SWEEP_SHARDS', 1))
+HABIT_SWEEP_USERS_PER_BATCH = 100
+
+# Number of periods of tasks materialized ahead of time. None writes the whole
+# goal when a habit is created; a number enables the rolling task window.
+HABIT_TASK_WINDOW_PERIODS = None
+
+# Extra streak milestones, keyed by period and streak length in periods, e.g.
+# {'daily': {60: '60-Day Streak'}, 'annual': {1: '1-Year Streak'}}
+HABIT_STREAK_MILESTONES = {}
+
+# Precomputed habit rankings, refreshed by `manage.py refresh_rankings`: run it
+# from cron, e.g. every 15 minutes, and with --if-empty after each `migrate` so a
+# fresh deployment has rankings to show. Every refresh rewrites the rankings of
+# the whole installation, so HABIT_RANKING_REFRESH_INTERVAL, which refreshes them
+# every that many seconds from each serving process, is only meant for a single
+# process. HABIT_RANKING_REFRESH_EVERY also refreshes them inline after that many
+# streak changes, counted in the default cache; leave it off with several workers.
+HABIT_RANKING_REFRESH_INTERVAL = None
+HABIT_RANKING_REFRESH_EVERY = None
+
+# Per-user analytics cache: an in-process LRU store by default, or any cache
+# from CACHES with {'BACKEND': 'django', 'ALIAS': 'default', 'TIMEOUT': 300}.
+# The LRU store only sees invalidations of its own process: with several workers
+# or with `manage.py sweep_overdue_tasks`, use the 'django' backend on a cache
+# shared by every process (e.g. Redis or Memcached).
+HABIT_ANALYTICS_CACHE = {
+    'BACKEND': 'lru',
+    'MAX_ENTRIES': 1024,
+    'TIMEOUT': 300,
+}
+
+# SQL query budgets per URL name, enforced in tests by habit.queries.assert_query_budget.
+# Every named URL outside the admin has one. With DEBUG and HABIT_QUERY_INSTRUMENTATION
+# set, QueryBudgetMiddleware also logs the queries of every request and warns when
+# a view goes over its budget.
+HABIT_QUERY_INSTRUMENTATION = False
+HABIT_QUERY_BUDGETS = {
+    'habit-home': {'queries': 15, 'duplicates': 2},
+    'complete_tasks': {'queries': 12, 'duplicates': 0},
+    'journal_export': {'queries': 6, 'duplicates': 0},
+    'habit_creation': {'queries': 12, 'duplicates': 0},
+    'habit_deletion': {'queries': 9, 'duplicates': 0},
+    'active_habits': {'queries': 5, 'duplicates': 0},
+    'habit_detail': {'queries': 6, 'duplicates': 0},
+    'HabitsAnalysis': {'queries': 12, 'duplicates': 4},
+    'login': {'queries': 12, 'duplicates': 0},
+    'logout': {'queries': 4, 'duplicates': 0},
+    # The profile template reads the user of the profile again
+    'profile': {'queries': 4, 'duplicates': 1},
+    # Both post_save handlers of Users save the new profile, counting its habits
+    'register': {'queries': 6, 'duplicates': 1},
+}
+
+# Sampling profiler. A rate above 0 profiles that fraction of requests with
+# cProfile into HABIT_PROFILE_DIR/<url name>/, one request per process at a time;
+# aggregate the results with `manage.py profile_report`. Async views are only
+# partly covered: their code running on the event loop is not profiled.
+HABIT_PROFILE_SAMPLE_RATE = 0
+HABIT_PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Maximum number of tasks completed by one request to the bulk completion endpoint
+HABIT_BULK_COMPLETION_LIMIT = 100
+
+# Serve the home and analysis pages with the async views of habit.async_views.
+# Only worth it under an ASGI server (Habit_Tracker/asgi.py); under WSGI every
+# async view pays for its own event loop.
+HABIT_ASYNC_VIEWS = False
+
+# Database alias of the read replica serving the analytics reads. A user who
+# completes a task reads from the primary for HABIT_REPLICA_PIN_SECONDS seconds.
+HABIT_ANALYTICS_REPLICA = None
+HABIT_REPLICA_PIN_SECONDS = 5
+
+# Number of rows read per query by the journal exports (`export/<table>.<format>`
+# and `manage.py export_journal`)
+HABIT_EXPORT_CHUNK_SIZE = 2000
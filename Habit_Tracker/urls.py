@@ -18,9 +18,15 @@ from django.contrib.auth import views as auth_views
 from django.urls import path
 from Users import views as user_views
 from habit import views as habit_views
+from habit import async_views
 from django.conf import settings
 from django.conf.urls.static import static
 
+# Serve the home and analysis pages with their async views under an ASGI server
+if getattr(settings, 'HABIT_ASYNC_VIEWS', False):
+    home_view, analysis_view = async_views.AsyncHabitView, async_views.AsyncHabitAnalysis
+else:
+    home_view, analysis_view = habit_views.HabitView, habit_views.HabitAnalysis
 
 
 
@@ -31,14 +37,17 @@ urlpatterns = [
     path('Profile/', user_views.profile, name='profile'),
     path('Logout', auth_views.LogoutView.as_view(template_name='Users/logout.html'), name='logout'),
 
-    path('', habit_views.HabitView.as_view(), name='habit-home'),
+    path('', home_view.as_view(), name='habit-home'),
+    path('tasks/complete/', habit_views.TaskCompletionView.as_view(), name='complete_tasks'),
+    path('export/<slug:table>.<slug:export_format>', habit_views.JournalExportView.as_view(),
+         name='journal_export'),
 
     path('Add-Habit/', habit_views.HabitManagerView.add_habit, name='habit_creation'),
     path('delete-habit/<int:habit_id>/', habit_views.HabitManagerView.delete_habit, name='habit_deletion'),
     path('Habit-Manager/', habit_views.HabitManagerView.active_habits, name = 'active_habits'),
     path('Habit-Infos/<int:habit_id>/', habit_views.HabitManagerView.habit_detail, name='habit_detail'),
 
-    path('Habits-Analysis/', habit_views.HabitAnalysis.as_view(), name = 'HabitsAnalysis'),
+    path('Habits-Analysis/', analysis_view.as_view(), name = 'HabitsAnalysis'),
 ]
 
 if settings.DEBUG:
@@ -11,12 +11,23 @@ and analysis of habit data.
 
 """
 
-from datetime import timedelta
+import asyncio
+import warnings
 from functools import partial
+from datetime import timedelta, timezone as dt_timezone
 import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
 from django.utils import timezone
-from django.db.models import Min, Prefetch
-from habit.models import TaskTracker, Habit, Streak, Achievement
+from django.db.models import Case, Count, F, FilteredRelation, FloatField, Min, OuterRef, Prefetch, Q, \
+    Subquery, Value, When
+from django.db.models.functions import Coalesce, Mod, Round
+from habit.cache import bump_user_versions
+from habit.models import TaskTracker, Habit, Streak, Achievement, HabitRanking
+from habit.leaderboard import top_habit_ids
+from habit.routers import analytics_database, analytics_reads
 
 
 def all_tracked_habits(user_id):
@@ -34,79 +45,123 @@ def all_tracked_habits(user_id):
         A queryset containing all tracked habits for the user, including streak information.
 
     """
-    return Habit.objects.filter(user_id=user_id,
-                                completion_date__gte=timezone.now()
-                                ).prefetch_related('streak')
+    return annotate_progress(Habit.objects.filter(user_id=user_id,
+                                                  completion_date__gte=timezone.now()))
 
 
-def habits_by_period(period):
+HABIT_PERIODS = ('daily', 'weekly', 'monthly')
+
+
+def partition_by_period(habits, periods=HABIT_PERIODS):
     """
-    Return a function to filter habits by period.
+    Partition habits by period in a single pass.
 
     Parameters
     ----------
-    period : str
-        The period to filter habits by.
+    habits : iterable
+        The habits to partition. A queryset is evaluated once.
+    periods : iterable, optional
+        The periods to partition habits into. Defaults to ``HABIT_PERIODS``.
 
     Returns
     -------
-    function
-        A function that can be used to filter habits by the specified period.
+    dict
+        A dictionary mapping 'all' to every habit and each period to the list
+        of habits with that period, in their original order.
 
     """
-    return partial(filter_habits_by_period, period)
+    partitions = {'all': []}
+    partitions.update((period, []) for period in periods)
+    for habit in habits:
+        partitions['all'].append(habit)
+        if habit.period in partitions:
+            partitions[habit.period].append(habit)
+    return partitions
 
 
-def filter_habits_by_period(period, habits):
+def active_habits_by_period(user_id):
     """
-    Filter habits by a specified period.
+    Retrieve a user's tracked habits with their progress, partitioned by period.
+
+    The habits, their streak counters and their progress percentage are fetched
+    in one query, then shared by every partition.
 
     Parameters
     ----------
-    period : str
-        The period to filter habits by.
-    habits : QuerySet
-        A queryset containing habits to be filtered.
+    user_id : int
+        The ID of the user for whom habits are to be retrieved.
 
     Returns
     -------
-    QuerySet
-        A filtered queryset containing habits filtered by the specified period.
+    dict
+        The partitions returned by ``partition_by_period``.
 
     """
-    return habits.filter(period=period)
+    return partition_by_period(all_tracked_habits(user_id=user_id))
 
 
-def longest_current_streak_over_all_habits():
+def top_streak_habits(field, k=1, user_id=None):
     """
-    Retrieve the habit ID of the habit with the longest current streak from the Streak table.
+    Retrieve the habits with the longest streaks.
+
+    Parameters
+    ----------
+    field : str
+        The Streak field ranked, 'current_streak' or 'longest_streak'.
+    k : int, optional
+        The number of habits to retrieve. Defaults to 1.
+    user_id : int, optional
+        The ID of the user whose habits are ranked. Defaults to every user.
 
     Returns
     -------
-    int
-        The habit ID of the habit with the longest current streak.
+    list
+        The habits, annotated by ``annotate_progress``, ordered by descending streak.
+        They are read from the analytics database of the user.
 
     """
-    first_streak = Streak.objects.order_by('-current_streak').first()
-    if first_streak is None:
-        return Habit.objects.none()  # Return an empty queryset if no streaks are found
-    return Habit.objects.filter(id=first_streak.habit_id).prefetch_related('streak')
+    with analytics_reads(user_id):
+        habit_ids = top_habit_ids(field, k, user_id)
+        habits = annotate_progress(Habit.objects.filter(id__in=habit_ids)).in_bulk()
+    return [habits[habit_id] for habit_id in habit_ids if habit_id in habits]
 
 
-def longest_streak_over_all_habits():
+def longest_current_streak_over_all_habits(user_id=None):
     """
-    Retrieve the habit ID of the habit with the longest streak from the Streak table.
+    Retrieve the habit with the longest current streak.
+
+    Parameters
+    ----------
+    user_id : int, optional
+        The ID of the user whose habits are considered. Defaults to every user.
 
     Returns
     -------
-    int
-        The habit ID of the habit with the longest streak.
+    list
+        A list holding the habit with the longest current streak, or an empty
+        list if no streaks are found.
+
+    """
+    return top_streak_habits('current_streak', user_id=user_id)
+
+
+def longest_streak_over_all_habits(user_id=None):
+    """
+    Retrieve the habit with the longest streak.
+
+    Parameters
+    ----------
+    user_id : int, optional
+        The ID of the user whose habits are considered. Defaults to every user.
+
+    Returns
+    -------
+    list
+        A list holding the habit with the longest streak, or an empty list if
+        no streaks are found.
 
     """
-    first_streak = Streak.objects.order_by('-longest_streak').first()
-    if first_streak is None:
-        return Habit.objects.none()  # Return an empty queryset if no streaks are found
-    return Habit.objects.filter(id=first_streak.habit_id).prefetch_related('streak')
+    return top_streak_habits('longest_streak', user_id=user_id)
 
 def longest_streak_for_habit(id):
     """
@@ -145,7 +200,7 @@ def due_today_tasks(user_id):
     now = timezone.now()
     twenty_four_hours = now + timedelta(hours=25, minutes=2)
     due_today = TaskTracker.objects.filter(
-        habit__user_id=user_id,
+        user_id=user_id,
         due_date__range=(now, twenty_four_hours),
         task_status='In progress'
     )
@@ -170,7 +225,7 @@ def active_tasks(user_id):
     now = timezone.now()+timedelta(hours=1)
     # Query tasks that are available to be completed
     tasks = TaskTracker.objects.filter(
-        habit__user_id=user_id,
+        user_id=user_id,
         task_status='In progress',
         start_date__lte=now,
         due_date__gt=now
@@ -192,53 +247,53 @@ def upcoming_tasks(user_id):
         A queryset containing upcoming tasks for the specified user, 
         starting at least one hour from the current time.
     """
-    tasks = TaskTracker.objects.filter(habit__user_id=user_id,
+    tasks = TaskTracker.objects.filter(user_id=user_id,
                                        start_date__gte=timezone.now()+timedelta(hours=1),
                                        task_number=1)
     return tasks
 
 
 
-def calculate_progress(habits):
+def annotate_progress(habits):
     """
-    Calculate progress percentage for each active habit.
+    Annotate habits with their streak counters, in-progress tasks and progress.
 
-    Parameters
-    ----------
-    habits : QuerySet
-        A queryset containing active habits.
-
-    """
-    # Calculate progress percentage for each active habit
-    for habit in habits:
-        if habit.num_of_tasks > 0:
-            streak = habit.streak.first()
-            habit.progress_percentage = round(
-                (streak.num_of_completed_tasks / habit.num_of_tasks) * 100, 2)
-        else:
-            habit.progress_percentage = 0.0
-
-def num_inprogress_tasks(habit):
-    """
-    Update the number of tasks in progress for a habit.
+    Every value is computed by the database in the query fetching the habits,
+    so templates can read them without a query per habit. The streak counters
+    are read through a single join on the habit's first streak.
 
     Parameters
     ----------
-    habit : Habit
-        The habit for which the number of in-progress tasks is to be updated.
+    habits : QuerySet
+        A queryset of habits.
 
     Returns
     -------
-    None
-
-    Notes
-    -----
-    This function counts the number of tasks in progress for the specified 
-    habit in the TaskTracker table and updates the in_progress attribute of 
-    the habit object accordingly.
-    """
-    in_progress_num = TaskTracker.objects.filter(habit=habit, task_status='In progress').count()
-    habit.in_progress = in_progress_num
+    QuerySet
+        The queryset annotated with ``num_of_completed_tasks``, ``num_of_failed_tasks``,
+        ``longest_streak``, ``current_streak``, ``in_progress`` and ``progress_percentage``.
+
+    """
+    first_streak = Streak.objects.filter(habit_id=OuterRef('pk')).order_by('pk').values('pk')[:1]
+    in_progress = TaskTracker.objects.filter(
+        habit_id=OuterRef('pk'), task_status='In progress'
+        ).order_by().values('habit_id').annotate(count=Count('pk')).values('count')
+    habits = habits.annotate(first_streak=FilteredRelation(
+        'streak', condition=Q(streak__pk=Subquery(first_streak))))
+    habits = habits.annotate(**{
+        field: Coalesce(F(f'first_streak__{field}'), 0)
+        for field in ('num_of_completed_tasks', 'num_of_failed_tasks',
+                      'longest_streak', 'current_streak')
+    })
+    return habits.annotate(
+        in_progress=Coalesce(Subquery(in_progress), 0),
+        progress_percentage=Case(
+            When(num_of_tasks__gt=0,
+                 then=Round(F('num_of_completed_tasks') * 100.0 / F('num_of_tasks'), 2)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
 
 
 def calculate_score(completed_tasks, failed_tasks, longest_streak, current_streak,
@@ -246,24 +301,29 @@ def calculate_score(completed_tasks, failed_tasks, longest_streak, current_strea
     """
     Calculate the score for a habit based on various factors and weights.
 
+    Every argument but ``weights`` may also be a NumPy array, in which case the
+    scores of all habits are computed at once.
+
     Parameters
     ----------
-    completed_tasks : int
+    completed_tasks : int or numpy.ndarray
         The number of completed tasks for the habit.
-    failed_tasks : int
+    failed_tasks : int or numpy.ndarray
         The number of failed tasks for the habit.
-    longest_streak : int
+    longest_streak : int or numpy.ndarray
         The longest streak for the habit.
-    num_of_tasks : int
+    current_streak : int or numpy.ndarray
+        The current streak for the habit.
+    num_of_tasks : int or numpy.ndarray
         The total number of tasks for the habit.
-    duration : int
+    duration : int or numpy.ndarray
         The duration of the habit in days.
     weights : dict
         A dictionary containing weights for different factors.
 
     Returns
     -------
-    float
+    float or numpy.ndarray
         The calculated score for the habit.
 
     """
@@ -281,37 +341,42 @@ def normalize_scores(scores):
 
     Parameters
     ----------
-    scores : list
-        A list of scores to be normalized.
+    scores : array_like
+        The scores to be normalized.
 
     Returns
     -------
-    list
-        A list of normalized scores.
+    numpy.ndarray
+        The z-scores of the input, or NaN everywhere when all scores are equal.
 
     """
-    mu = np.mean(scores)
-    sigma = np.std(scores)
-    z_scores = []
-    for x in scores:
-        if sigma != 0:
-            z_scores.append((x - mu) / sigma)
-        else:
-            z_scores.append(np.nan)  # or handle the case where sigma is zero appropriately
+    scores = np.asarray(scores, dtype=float)
+    if not scores.size:
+        return scores
+    mu = scores.mean()
+    sigma = scores.std()
+    if sigma == 0:
+        return np.full(scores.shape, np.nan)
+    return (scores - mu) / sigma
 
-    return z_scores
 
-
-def rank_habits(weights, period):
+def rank_habits(weights, period, top_k=None):
     """
     Rank habits based on their scores.
 
+    The habit and streak columns are loaded with a single ``values_list`` query
+    and scored, normalized and ranked as NumPy array expressions. Habit objects
+    are only fetched for the habits that are returned. Every query is sent to
+    the analytics database.
+
     Parameters
     ----------
     weights : dict
         A dictionary containing weights for different factors.
     period : str
         The period for which habits should be ranked.
+    top_k : int, optional
+        The number of top-ranked habits to return. Defaults to all of them.
 
     Returns
     -------
@@ -320,38 +385,327 @@ def rank_habits(weights, period):
        ranked in descending order.
 
     """
-    scores = []
+    with analytics_reads():
+        return _rank_habits(weights, period, top_k)
+
+
+# The columns ranked, loaded from the query rows in one conversion
+_RANK_COLUMNS = np.dtype([
+    ('id', np.int64), ('num_of_tasks', np.int64), ('creation_time', 'datetime64[us]'),
+    ('completed_tasks', np.int64), ('failed_tasks', np.int64),
+    ('longest_streak', np.int64), ('current_streak', np.int64),
+])
+
+
+def _rank_habits(weights, period, top_k):
     now = timezone.now()
     last_month = now - timedelta(days=30)
 
-    prefetch_streaks = Prefetch('streak', queryset=Streak.objects.all())
-    # Fetch habits with prefetching of related streaks
-    habits = Habit.objects.prefetch_related(prefetch_streaks).filter(period=period,
-                                                creation_time__range=(last_month, now))
+    rows = Habit.objects.filter(period=period, creation_time__range=(last_month, now),
+                                streak__isnull=False
+                                ).order_by('id', 'streak__id').values_list(
+                                    'id', 'num_of_tasks', 'creation_time',
+                                    'streak__num_of_completed_tasks', 'streak__num_of_failed_tasks',
+                                    'streak__longest_streak', 'streak__current_streak')
+    rows = list(rows)
+    if not rows:
+        return []
+
+    with warnings.catch_warnings():
+        # NumPy converts the aware creation times to UTC and warns that it drops their time zone
+        warnings.simplefilter('ignore', UserWarning)
+        columns = np.array(rows, dtype=_RANK_COLUMNS)
+
+    # Keep the latest streak of each habit
+    habit_ids = columns['id']
+    columns = columns[np.append(habit_ids[1:] != habit_ids[:-1], True)]
+    habit_ids = columns['id']
+
+    # subtract one day from creation time to avoid ZeroDivisionError
+    one_day = np.timedelta64(1, 'D')
+    now_utc = np.datetime64(timezone.make_naive(now, dt_timezone.utc), 'us')
+    duration = (now_utc - columns['creation_time'] + one_day) // one_day
+
+    scores = calculate_score(columns['completed_tasks'], columns['failed_tasks'],
+                             columns['longest_streak'], columns['current_streak'],
+                             columns['num_of_tasks'], duration, weights)
+    normalized_scores = normalize_scores(scores)
 
-    for habit in habits:
-        streak = habit.streak.latest('id')
-        if streak is not None:
-            num_of_tasks = habit.num_of_tasks
-            completed_tasks = streak.num_of_completed_tasks
-            failed_tasks = streak.num_of_failed_tasks
-            longest_streak = streak.longest_streak
-            current_streak = streak.current_streak
-            # subtract one day from creation time to avoid ZeroDivisionError
-            duration = (now - (habit.creation_time - timedelta(days=1))).days
+    if top_k is not None and top_k < len(habit_ids):
+        ranked = np.argpartition(-normalized_scores, top_k - 1)[:top_k]
+        ranked = ranked[np.lexsort((ranked, -normalized_scores[ranked]))]
+    else:
+        ranked = np.argsort(-normalized_scores, kind='stable')
 
-            score = calculate_score(completed_tasks, failed_tasks, longest_streak,
-                                    current_streak, num_of_tasks, duration, weights)
+    ranked_ids = habit_ids[ranked].tolist()
+    habits = Habit.objects.prefetch_related('streak').in_bulk(ranked_ids)
+    ranked_habits = list(zip((habits[habit_id] for habit_id in ranked_ids),
+                             normalized_scores[ranked].tolist()))
 
-            scores.append(score)
-        else:
-            pass
+    return ranked_habits
 
+RANKING_PROFILES = {
+    'struggled_most': {
+        'completed_tasks': -0.2,
+        'failed_tasks': 0.8,
+        'longest_streak': -0.2,
+        'current_streak': -0.1
+    },
+}
 
-    normalized_scores = normalize_scores(scores)
-    ranked_habits = sorted(zip(habits, normalized_scores), key=lambda x: x[1], reverse=True)
+RANKING_PERIODS = ('daily', 'weekly')
+
+
+def ranking_profiles():
+    """
+    Return the weight profiles used to rank habits.
+
+    Returns
+    -------
+    dict
+        The ``HABIT_RANKING_PROFILES`` setting if defined, else ``RANKING_PROFILES``.
+    """
+    return getattr(settings, 'HABIT_RANKING_PROFILES', None) or RANKING_PROFILES
+
+
+def refresh_habit_rankings(periods=RANKING_PERIODS, profiles=None):
+    """
+    Recompute the HabitRanking table.
+
+    The cached analytics of the users ranked before or after the refresh are
+    invalidated once each ranking is committed.
+
+    Parameters
+    ----------
+    periods : iterable, optional
+        The periods to rank. Defaults to ``RANKING_PERIODS``.
+    profiles : iterable, optional
+        The names of the weight profiles to rank with. Defaults to every profile.
+
+    Returns
+    -------
+    int
+        The number of ranking rows written.
+    """
+    all_profiles = ranking_profiles()
+    if profiles is None:
+        profiles = list(all_profiles)
+
+    now = timezone.now()
+    written = 0
+    for profile in profiles:
+        for period in periods:
+            ranked = rank_habits(all_profiles[profile], period)
+            rankings = [
+                HabitRanking(habit=habit, user_id=habit.user_id, period=period, profile=profile,
+                             rank=rank, score=None if np.isnan(score) else score,
+                             refreshed_at=now)
+                for rank, (habit, score) in enumerate(ranked, start=1)
+            ]
+            # Swap the whole ranking at once so readers never see a partial one
+            with transaction.atomic():
+                previous = HabitRanking.objects.filter(profile=profile, period=period)
+                user_ids = set(previous.values_list('user_id', flat=True))
+                user_ids.update(ranking.user_id for ranking in rankings)
+                previous.delete()
+                HabitRanking.objects.bulk_create(rankings)
+                transaction.on_commit(partial(bump_user_versions, user_ids))
+            written += len(rankings)
+    return written
+
+
+def note_streak_changes(count=1):
+    """
+    Count streak changes and refresh the rankings every ``HABIT_RANKING_REFRESH_EVERY`` changes.
+
+    The refresh runs inside the request that reaches the count, and the counter
+    lives in Django's default cache, so it is only shared across processes when
+    that cache is. It is off by default; the rankings are refreshed by
+    ``manage.py refresh_rankings``, run from cron or a single process.
+
+    Parameters
+    ----------
+    count : int, optional
+        The number of streak changes to record. Defaults to 1.
+
+    Returns
+    -------
+    bool
+        True if the rankings were refreshed.
+    """
+    refresh_every = getattr(settings, 'HABIT_RANKING_REFRESH_EVERY', None)
+    if not refresh_every or not count:
+        return False
+
+    key = 'habit:ranking:streak-changes'
+    cache.add(key, 0, timeout=None)
+    if cache.incr(key, count) < refresh_every:
+        return False
+    cache.set(key, 0, timeout=None)
+    refresh_habit_rankings()
+    return True
+
+
+def ranked_habits(user_id, period, profile='struggled_most', top_k=None):
+    """
+    Retrieve a user's habits in their precomputed ranking order.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user whose habits are to be retrieved.
+    period : str
+        The period of the ranking.
+    profile : str, optional
+        The weight profile of the ranking. Defaults to 'struggled_most'.
+    top_k : int, optional
+        The number of top-ranked habits to return. Defaults to all of them.
+
+    Returns
+    -------
+    list
+        A list of tuples containing habit objects and their normalized scores,
+        ranked in descending order, as returned by ``rank_habits``.
+    """
+    rankings = HabitRanking.objects.filter(
+        user_id=user_id, profile=profile, period=period
+        ).prefetch_related(Prefetch('habit', queryset=annotate_progress(Habit.objects.all()))
+        ).order_by('rank')
+    if top_k is not None:
+        rankings = rankings[:top_k]
+    return [(ranking.habit, ranking.score) for ranking in rankings]
+
+
+def analysis_reads(user_id):
+    """
+    Return the independent reads of a user's analysis page.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user whose analytics are computed.
+
+    Returns
+    -------
+    dict
+        Callables without arguments keyed by name, each running one read.
+        They do not depend on each other and may run in any order.
+    """
+    return {
+        # All tracked habits with their progress, partitioned by period
+        'habits': lambda: active_habits_by_period(user_id),
+        'completed_habits': lambda: list(all_completed_habits(user_id)),
+        'longest_current_all_streak': lambda: longest_current_streak_over_all_habits(user_id),
+        'longest_all_streak': lambda: longest_streak_over_all_habits(user_id),
+        # The user's top-ranked habit of each period from the precomputed rankings
+        'daily_struggled_most': lambda: ranked_habits(user_id, 'daily', 'struggled_most', top_k=1),
+        'weekly_struggled_most': lambda: ranked_habits(user_id, 'weekly', 'struggled_most', top_k=1),
+    }
+
+
+def build_analysis_context(reads):
+    """
+    Assemble the analysis page context from the results of ``analysis_reads``.
+
+    Parameters
+    ----------
+    reads : dict
+        The result of each read, keyed by name.
+
+    Returns
+    -------
+    dict
+        The analysis page context. Querysets are evaluated into lists so the
+        result can be cached and pickled.
+    """
+    habits = reads['habits']
+    summary = {
+        'all_habits': habits['all'],
+        'daily_habits': habits['daily'],
+        'weekly_habits': habits['weekly'],
+        'monthly_habits': habits['monthly'],
+        'daily_struggled_most' : reads['daily_struggled_most'],
+        'weekly_struggled_most' : reads['weekly_struggled_most'],
+        'longest_all_streak': reads['longest_all_streak'],
+        'longest_current_all_streak': reads['longest_current_all_streak'],
+        'completed_habits': reads['completed_habits']
+    }
+    for name, habits in summary.items():
+        summary[name] = list(habits)
+    return summary
+
+
+def analysis_summary(user_id):
+    """
+    Compute the analytics displayed on a user's analysis page.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user whose analytics are computed.
+
+    Returns
+    -------
+    dict
+        The analysis page context, as returned by ``build_analysis_context``.
+    """
+    reads = {name: read() for name, read in analysis_reads(user_id).items()}
+    return build_analysis_context(reads)
+
+
+def _closing_connections(read):
+    """
+    Wrap a read to close the database connections of its thread once it is done.
+    """
+    def run():
+        try:
+            return read()
+        finally:
+            connections.close_all()
+    return run
+
+
+async def agather_reads(*reads):
+    """
+    Run independent reads concurrently, each on a worker thread of its own.
+
+    By default ``sync_to_async`` runs every call of a request on one shared
+    thread, one after another. The reads run outside it instead, each on a
+    database connection of its own that is closed, or returned to its pool,
+    when the read is done.
+
+    Parameters
+    ----------
+    *reads : callable
+        Callables without arguments, each running one read.
+
+    Returns
+    -------
+    list
+        The result of each read, in the order of ``reads``.
+    """
+    return await asyncio.gather(*(sync_to_async(_closing_connections(read), thread_sensitive=False)()
+                                  for read in reads))
+
+
+async def aanalysis_summary(user_id):
+    """
+    Compute the analytics displayed on a user's analysis page, issuing the reads concurrently.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user whose analytics are computed.
+
+    Returns
+    -------
+    dict
+        The analysis page context, as returned by ``build_analysis_context``.
+    """
+    reads = analysis_reads(user_id)
+    results = await agather_reads(*reads.values())
+    return build_analysis_context(dict(zip(reads, results)))
 
-    return ranked_habits
 
 def all_completed_habits(user_id):
     """
@@ -369,14 +723,14 @@ def all_completed_habits(user_id):
         
     Notes
     -----
-    This function prefetches streak information for each habit and filters the habits
+    This function annotates each habit with its streak counters and filters the habits
     based on the user ID and completion date.
     It returns a queryset containing all completed habits for the specified user, where the 
-    habit completion date is earlier than the current time.
+    habit completion date is earlier than the current time. The queryset reads from the
+    analytics database of the user.
     """
-    prefetch_streaks = Prefetch('streak', queryset=Streak.objects.all())
-    # num_of_tasks = F'streak.num_of_completed_tasks' + F'streak.num_of_failed_tasks',
-    return Habit.objects.prefetch_related(prefetch_streaks).filter(user_id=user_id, completion_date__lt=timezone.now())
+    habits = Habit.objects.using(analytics_database(user_id))
+    return annotate_progress(habits.filter(user_id=user_id, completion_date__lt=timezone.now()))
 
 
 def extract_first_failed_task(updated_task_ids):
@@ -429,10 +783,38 @@ def update_user_activity(user_id):
     Achievements are updated based on failed tasks, and streaks are updated for 
     relevant habits.
     """
+    update_users_activity([user_id])
+
+
+def update_users_activity(user_ids):
+    """
+    Update tasks, achievements, and streaks for a batch of users.
+
+    Parameters
+    ----------
+    user_ids : list
+        The IDs of the users whose activity is to be updated.
+
+    Returns
+    -------
+    int
+        The number of tasks updated to 'Failed'.
+
+    Notes
+    -----
+    Only the tasks flipped by this call are used to update achievements and
+    streaks, so running it concurrently with the on-request path (or with
+    another sweep) never applies the same failure twice.
+    """
+
+    # Materialize the tasks that entered the rolling window, if enabled
+    TaskTracker.extend_task_window(Habit.objects.filter(user_id__in=user_ids))
 
     # Update tasks statuses from in progress to failed and get their ids
-    updated_habit_tasks_ids = TaskTracker.update_failed_tasks(user_id=user_id)
+    updated_habit_tasks_ids = TaskTracker.fail_overdue_tasks(user_ids)
     updated_habit_ids, updated_task_ids = updated_habit_tasks_ids
+    if not updated_task_ids:
+        return 0
 
     # The first failed task for each habit is used later to correctly identify
     # when the user breaks a Habit streak.
@@ -441,3 +823,62 @@ def update_user_activity(user_id):
     # Update achievements if failed task
     Achievement.update_achievements(first_failed_tasks)
     Streak.update_streak(updated_habit_ids)
+    note_streak_changes(len(set(updated_habit_ids)))
+    return len(updated_task_ids)
+
+
+def users_with_overdue_tasks(shard=0, num_shards=1):
+    """
+    Retrieve the IDs of users owning at least one overdue 'In progress' task.
+
+    Parameters
+    ----------
+    shard : int, optional
+        The shard to return, in ``range(num_shards)``. Defaults to 0.
+    num_shards : int, optional
+        The number of shards users are split into by ``user_id % num_shards``.
+        Defaults to 1.
+
+    Returns
+    -------
+    list
+        The sorted user IDs belonging to the requested shard.
+    """
+    tasks = TaskTracker.objects.filter(due_date__lt=timezone.now(), task_status='In progress')
+    if num_shards > 1:
+        # Shard in SQL so each worker only reads the users of its own shard
+        tasks = tasks.annotate(shard=Mod('user_id', num_shards)).filter(shard=shard)
+    return list(tasks.order_by('user_id').values_list('user_id', flat=True).distinct())
+
+
+def sweep_overdue_tasks(shard=0, num_shards=1, users_per_batch=None):
+    """
+    Update the activity of every user with overdue tasks, in batches of users.
+
+    Parameters
+    ----------
+    shard : int, optional
+        The shard of users to sweep. Defaults to 0.
+    num_shards : int, optional
+        The total number of shards. Defaults to 1.
+    users_per_batch : int, optional
+        The number of users swept together. Defaults to the
+        ``HABIT_SWEEP_USERS_PER_BATCH`` setting.
+
+    Returns
+    -------
+    int
+        The number of tasks updated to 'Failed'.
+    """
+    if users_per_batch is None:
+        users_per_batch = getattr(settings, 'HABIT_SWEEP_USERS_PER_BATCH', 100)
+
+    # Top up the rolling task window of every habit in the shard, if enabled
+    TaskTracker.extend_task_window(
+        Habit.objects.annotate(shard=Mod('user_id', num_shards)).filter(shard=shard))
+
+    user_ids = users_with_overdue_tasks(shard, num_shards)
+    failed = 0
+    for i in range(0, len(user_ids), users_per_batch):
+        failed += update_users_activity(user_ids[i:i + users_per_batch])
+    return failed
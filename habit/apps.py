@@ -7,3 +7,6 @@ class HabitConfig(AppConfig):
 
     def ready(self) -> None:
         import habit.signals
+
+        # The background jobs are started by the WSGI and ASGI entry points only,
+        # see habit.scheduler.start_background_jobs
@@ -0,0 +1,170 @@
+"""
+Asynchronous views of the Habit application's home and analysis pages.
+
+These views render the same pages as ``HabitView`` and ``HabitAnalysis``, but
+issue their independent reads concurrently with ``agather_reads``, each on a
+worker thread and a database connection of its own. They are served under an ASGI server (``Habit_Tracker/asgi.py``)
+in place of the synchronous views when ``HABIT_ASYNC_VIEWS`` is set.
+
+Classes:
+    AsyncHabitView: Asynchronous home page and task completion.
+    AsyncHabitAnalysis: Asynchronous habit analysis page.
+"""
+
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import serializers
+from django.http import JsonResponse
+from django.shortcuts import render, redirect
+from django.views import View
+from .cache import acached_for_user
+from .models import TaskTracker, Habit, Streak
+from .routers import analytics_database
+from .analytics import (
+    due_today_tasks, active_tasks, upcoming_tasks,
+    update_user_activity, aanalysis_summary, agather_reads, note_streak_changes
+)
+
+
+class AsyncLoginRequiredView(View):
+    """
+    Base class of the asynchronous views, redirecting anonymous users to the login page.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        # request.user is loaded lazily from the session, which queries the database
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect('login')
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncHabitView(AsyncLoginRequiredView):
+    """
+    Asynchronous version of ``HabitView``.
+
+    Methods
+    -------
+    get(request, *args, **kwargs)
+        Handles GET requests for displaying the home page.
+    post(request, *args, **kwargs)
+        Handles POST requests for completing tasks.
+    """
+    async def get(self, request, *args, **kwargs):
+        """
+        Handles GET requests for displaying the home page.
+
+        The due-today, active and upcoming task queries are issued concurrently.
+
+        Parameters
+        ----------
+        request : HttpRequest
+            The HTTP request.
+
+        Returns
+        -------
+        HttpResponse
+            The HTTP response.
+        """
+        user = request.user
+        if getattr(settings, 'HABIT_SWEEP_ON_REQUEST', True):
+            await sync_to_async(update_user_activity)(user.id)
+
+        today_tasks, active_task, upcoming_task = await agather_reads(
+            lambda: list(due_today_tasks(user_id=user.id).select_related('habit')),
+            lambda: list(active_tasks(user_id=user.id).select_related('habit')),
+            lambda: list(upcoming_tasks(user_id=user.id).select_related('habit')),
+        )
+
+        context = {
+            'upcoming_tasks': upcoming_task,
+            'due_today_tasks': today_tasks,
+            'available_tasks': active_task,
+            'user_full_name': user.get_full_name().split()[0].capitalize()
+        }
+        return render(request, 'home.html', context)
+
+    async def post(self, request, *args, **kwargs):
+        """
+        Handles POST requests for completing tasks.
+
+        Parameters
+        ----------
+        request : HttpRequest
+            The HTTP request.
+
+        Returns
+        -------
+        HttpResponse
+            The HTTP response.
+        """
+        try:
+            task_id = int(request.POST.get('task_id'))
+            habit_id = int(request.POST.get('habit_id'))
+        except (TypeError, ValueError):
+            return redirect('habit-home')
+
+        def complete():
+            streak = TaskTracker.complete_task(task_id, habit_id, request.user.id)
+            if streak:
+                note_streak_changes()
+
+        await sync_to_async(complete)()
+        return redirect('habit-home')
+
+
+class AsyncHabitAnalysis(AsyncLoginRequiredView):
+    """
+    Asynchronous version of ``HabitAnalysis``.
+
+    Methods
+    -------
+    get(request, *args, **kwargs)
+        Handles GET requests for habit analysis.
+    post(request, *args, **kwargs)
+        Handles POST requests for habit analysis.
+    """
+    async def get(self, request, *args, **kwargs):
+        """
+        Handles GET requests for habit analysis.
+
+        On a cache miss, the reads of the analysis page are issued concurrently.
+
+        Parameters
+        ----------
+        request : HttpRequest
+            The HTTP request.
+
+        Returns
+        -------
+        HttpResponse
+            Rendered analysis template with habit data.
+        """
+        user_id = request.user.id
+        context = await acached_for_user(user_id, 'analysis', lambda: aanalysis_summary(user_id))
+        return render(request, 'analysis.html', context)
+
+    async def post(self, request, *args, **kwargs):
+        """
+        Handles POST requests for habit analysis.
+
+        Parameters
+        ----------
+        request : HttpRequest
+            The HTTP request.
+
+        Returns
+        -------
+        JsonResponse
+            JSON response containing habit data with related streak information.
+        """
+        selected_value = request.POST.get('selectedValue')
+        database = await sync_to_async(analytics_database)(request.user.id)
+
+        habit, streaks = await agather_reads(
+            lambda: Habit.objects.using(database).get(id=selected_value),
+            lambda: list(Streak.objects.using(database).filter(habit_id=selected_value).values()),
+        )
+        habit_dict = json.loads(serializers.serialize('json', [habit]))[0]['fields']
+        habit_dict['streak'] = streaks
+        return JsonResponse(habit_dict, safe=False)
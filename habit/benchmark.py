@@ -0,0 +1,331 @@
+"""
+Benchmark harness for the hot paths of the Habit application.
+
+This module generates a synthetic multi-user dataset through the same code
+paths as the application (``Habit.save``, its signals and
+``TaskTracker.create_tasks``), times the hot paths with the Django test client
+and summarizes the latencies as percentiles, so that the results of a change
+can be compared against a saved baseline.
+
+Functions:
+    generate_dataset: Create users, habits and task histories.
+    run_benchmark: Time every benchmarked endpoint.
+    run_concurrency_benchmark: Compare the sync and async views under concurrent load.
+    summarize: Compute latency percentiles from timing samples.
+    compare_results: List the endpoints slower than in a baseline.
+"""
+
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import AsyncRequestFactory, Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from habit.analytics import update_user_activity
+from habit.async_views import AsyncHabitAnalysis, AsyncHabitView
+from habit.cache import bump_user_versions
+from habit.models import Habit, TaskTracker
+from habit.streaks import rebuild_streaks
+from habit.views import HabitAnalysis, HabitView
+
+
+# Period, goal in days and frequencies of the generated habits
+HABIT_SHAPES = [
+    ('daily', 30, (1, 2)),
+    ('daily', 60, (1,)),
+    ('weekly', 56, (1, 2, 3)),
+    ('monthly', 180, (1, 2)),
+]
+
+ENDPOINTS = ['update_user_activity', 'habit_home', 'complete_task', 'active_habits',
+             'habit_detail', 'analysis', 'analysis_cached']
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def generate_dataset(num_users, habits_per_user, history_days=60, completion_rate=0.7,
+                     seed=0, batch_size=1000):
+    """
+    Create users with habits and a resolved task history.
+
+    Habits start up to ``history_days`` days in the past. Every task due
+    before now is resolved as completed with probability ``completion_rate``
+    and as failed otherwise, then the streaks are rebuilt from that history.
+
+    Parameters
+    ----------
+    num_users : int
+        The number of users to create.
+    habits_per_user : int
+        The number of habits created for each user.
+    history_days : int, optional
+        The maximum age of a habit in days. Defaults to 60.
+    completion_rate : float, optional
+        The probability that a past task was completed. Defaults to 0.7.
+    seed : int, optional
+        The seed of the random generator. Defaults to 0.
+    batch_size : int, optional
+        The number of tasks resolved per UPDATE. Defaults to 1000.
+
+    Returns
+    -------
+    list
+        The created users.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password('benchmark')
+    prefix = f'bench-{seed}-{time.time_ns()}'
+    # Users are saved one by one so their profiles are created by the Users app's signals
+    users = [User.objects.create(username=f'{prefix}-{i}', password=password,
+                                 first_name='bench', last_name=f'user {i}')
+             for i in range(num_users)]
+
+    habit_ids = []
+    for user in users:
+        for i in range(habits_per_user):
+            period, goal, frequencies = rng.choice(HABIT_SHAPES)
+            habit = Habit.objects.create(
+                name=f'habit {i}', frequency=rng.choice(frequencies), period=period, goal=goal,
+                notes='', start_date=now - timedelta(days=rng.uniform(0, history_days)), user=user)
+            TaskTracker.create_tasks(habit)
+            habit_ids.append(habit.id)
+
+    past_tasks = list(TaskTracker.objects.filter(habit_id__in=habit_ids, due_date__lt=now))
+    for task in past_tasks:
+        task.task_status = 'Completed' if rng.random() < completion_rate else 'Failed'
+        task.task_completion_date = task.due_date
+    with transaction.atomic():
+        TaskTracker.objects.bulk_update(past_tasks, ['task_status', 'task_completion_date'],
+                                        batch_size=batch_size)
+    rebuild_streaks(habit_ids)
+    return users
+
+
+def summarize(samples):
+    """
+    Compute latency statistics from timing samples.
+
+    Parameters
+    ----------
+    samples : list
+        The measured durations in seconds.
+
+    Returns
+    -------
+    dict
+        The number of samples and the mean, percentiles and maximum in milliseconds.
+    """
+    if not samples:
+        return {'samples': 0}
+    ms = np.asarray(samples) * 1000
+    summary = {'samples': len(samples), 'mean_ms': float(ms.mean())}
+    for p, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        summary[f'p{p}_ms'] = float(value)
+    summary['max_ms'] = float(ms.max())
+    return summary
+
+
+def _timed(samples, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def run_benchmark(users, repeat=20, client_class=Client):
+    """
+    Time every benchmarked endpoint, cycling through the given users.
+
+    Parameters
+    ----------
+    users : list
+        The users the requests are made for, e.g. from ``generate_dataset``.
+    repeat : int, optional
+        The number of timed calls per endpoint. Defaults to 20.
+    client_class : type, optional
+        The test client class. Defaults to ``django.test.Client``.
+
+    Returns
+    -------
+    dict
+        The ``summarize`` statistics of each endpoint in ``ENDPOINTS``.
+
+    Raises
+    ------
+    RuntimeError
+        If a request does not return the expected status code.
+    """
+    samples = {name: [] for name in ENDPOINTS}
+    clients = []
+    for user in users:
+        client = client_class()
+        client.force_login(user)
+        clients.append(client)
+
+    habits = {user.id: list(Habit.objects.filter(user=user).values_list('id', flat=True))
+              for user in users}
+    now = timezone.now()
+    open_tasks = {user.id: list(TaskTracker.objects.filter(
+        user=user, task_status='In progress', start_date__lte=now, due_date__gt=now
+        ).values_list('id', 'habit_id')) for user in users}
+
+    def check(response, status=200):
+        if response.status_code != status:
+            raise RuntimeError(f'{response.request["PATH_INFO"]} returned '
+                               f'{response.status_code} instead of {status}.')
+
+    for i in range(repeat):
+        user = users[i % len(users)]
+        client = clients[i % len(users)]
+
+        _timed(samples['update_user_activity'], update_user_activity, user.id)
+        check(_timed(samples['habit_home'], client.get, reverse('habit-home')))
+        if open_tasks[user.id]:
+            task_id, habit_id = open_tasks[user.id].pop()
+            check(_timed(samples['complete_task'], client.post, reverse('habit-home'),
+                         {'task_id': task_id, 'habit_id': habit_id}), 302)
+        check(_timed(samples['active_habits'], client.get, reverse('active_habits')))
+        if habits[user.id]:
+            habit_id = habits[user.id][i % len(habits[user.id])]
+            check(_timed(samples['habit_detail'], client.get,
+                         reverse('habit_detail', args=[habit_id])))
+
+        # Time the analysis page once on a cold cache and once on a warm one
+        bump_user_versions([user.id])
+        check(_timed(samples['analysis'], client.get, reverse('HabitsAnalysis')))
+        check(_timed(samples['analysis_cached'], client.get, reverse('HabitsAnalysis')))
+
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+def compare_results(results, baseline, threshold=0.1, metrics=('p50_ms', 'p95_ms')):
+    """
+    List the endpoints slower than in a baseline.
+
+    Parameters
+    ----------
+    results : dict
+        The endpoint statistics of the current run.
+    baseline : dict
+        The endpoint statistics of the baseline run.
+    threshold : float, optional
+        The tolerated relative slowdown. Defaults to 0.1 (10%).
+    metrics : tuple, optional
+        The statistics compared. Defaults to the median and the 95th percentile.
+
+    Returns
+    -------
+    list
+        A list of ``(endpoint, metric, baseline_value, value)`` tuples, one per regression.
+    """
+    regressions = []
+    for name, stats in results.items():
+        for metric in metrics:
+            base = baseline.get(name, {}).get(metric)
+            value = stats.get(metric)
+            if base is not None and value is not None and value > base * (1 + threshold):
+                regressions.append((name, metric, base, value))
+    return regressions
+
+
+# The pages served by both a sync and an async view, with their view classes
+CONCURRENT_PAGES = {
+    'habit_home': ('/', HabitView, AsyncHabitView),
+    'analysis': ('/Habits-Analysis/', HabitAnalysis, AsyncHabitAnalysis),
+}
+
+
+def _concurrency_summary(samples, wall_time):
+    summary = summarize(samples)
+    summary['wall_s'] = wall_time
+    summary['throughput_rps'] = len(samples) / wall_time if wall_time else None
+    return summary
+
+
+def _run_sync_pages(users, requests, concurrency):
+    results = {}
+    factory = RequestFactory()
+    for name, (path, view_class, _) in CONCURRENT_PAGES.items():
+        view = view_class.as_view()
+        samples = []
+
+        def call(i):
+            request = factory.get(path)
+            request.user = users[i % len(users)]
+            start = time.perf_counter()
+            try:
+                view(request)
+            finally:
+                samples.append(time.perf_counter() - start)
+                # Worker threads each hold a connection of their own
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(call, range(requests)))
+        results[name] = _concurrency_summary(samples, time.perf_counter() - start)
+    return results
+
+
+async def _run_async_pages(users, requests, concurrency):
+    results = {}
+    factory = AsyncRequestFactory()
+    semaphore = asyncio.Semaphore(concurrency)
+    for name, (path, _, view_class) in CONCURRENT_PAGES.items():
+        view = view_class.as_view()
+        samples = []
+
+        async def call(i):
+            async with semaphore:
+                request = factory.get(path)
+                request.user = users[i % len(users)]
+                start = time.perf_counter()
+                await view(request)
+                samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(call(i) for i in range(requests)))
+        results[name] = _concurrency_summary(samples, time.perf_counter() - start)
+    return results
+
+
+def run_concurrency_benchmark(users, requests=100, concurrency=10):
+    """
+    Compare the sync and async views of the home and analysis pages under concurrent load.
+
+    The sync views are called from a pool of ``concurrency`` threads, as a
+    threaded WSGI server would; the async views from ``concurrency`` concurrent
+    tasks on one event loop, as an ASGI server would. The views are called
+    directly, without middleware, so only the views themselves are compared,
+    and the on-request sweep is turned off so that concurrent requests only read.
+    SQLite serializes connections, so run it against a server database for
+    representative numbers.
+
+    Parameters
+    ----------
+    users : list
+        The users the requests are made for, e.g. from ``generate_dataset``.
+    requests : int, optional
+        The number of requests per page and mode. Defaults to 100.
+    concurrency : int, optional
+        The number of requests in flight at once. Defaults to 10.
+
+    Returns
+    -------
+    dict
+        For 'sync' and 'async', the ``summarize`` statistics of each page plus
+        its wall time ('wall_s') and throughput ('throughput_rps').
+    """
+    with override_settings(HABIT_SWEEP_ON_REQUEST=False):
+        return {
+            'sync': _run_sync_pages(users, requests, concurrency),
+            'async': async_to_sync(_run_async_pages)(users, requests, concurrency),
+        }
@@ -0,0 +1,244 @@
+"""
+Per-user cache for analytics results in the Habit application.
+
+Analytics results are cached under a key made of the user ID, the result name
+and a per-user version counter. Any event that changes a user's analytics
+(a task completed or failed, a habit created or deleted) bumps the counter,
+so stale entries are never read again and simply age out of the cache.
+
+The store is configured with the ``HABIT_ANALYTICS_CACHE`` setting:
+
+    {'BACKEND': 'lru', 'MAX_ENTRIES': 1024, 'TIMEOUT': 300}
+        An in-process LRU store (the default). Only invalidations made in the
+        same process reach it, so it is only correct with a single serving
+        process that also runs the overdue sweep (``HABIT_SWEEP_IN_PROCESS``
+        or the on-request sweep). With several workers, or with
+        ``manage.py sweep_overdue_tasks``, use the 'django' backend on a
+        shared cache.
+    {'BACKEND': 'django', 'ALIAS': 'default', 'TIMEOUT': 300}
+        Any cache configured in Django's ``CACHES`` setting.
+
+Classes:
+    LRUCache: A thread-safe in-process LRU store.
+
+Functions:
+    cached_for_user: Return a cached analytics result, computing it on a miss.
+    acached_for_user: Asynchronous version of cached_for_user.
+    bump_user_versions: Invalidate the cached analytics of users.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+DEFAULT_CONFIG = {'BACKEND': 'lru', 'MAX_ENTRIES': 1024, 'TIMEOUT': 300}
+
+
+class LRUCache:
+    """
+    A thread-safe in-process store evicting the least recently used entries.
+
+    It implements the subset of Django's cache API used by this module.
+
+    Attributes
+    ----------
+    max_entries : int
+        The maximum number of entries kept.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value stored under ``key``, or ``default`` if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """
+        Store ``value`` under ``key`` for ``timeout`` seconds (forever when None).
+        """
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove ``key`` from the store.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry from the store.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+_backend = None
+
+
+def get_config():
+    """
+    Return the analytics cache configuration.
+
+    Returns
+    -------
+    dict
+        ``DEFAULT_CONFIG`` updated with the ``HABIT_ANALYTICS_CACHE`` setting.
+    """
+    return {**DEFAULT_CONFIG, **getattr(settings, 'HABIT_ANALYTICS_CACHE', {})}
+
+
+def get_backend():
+    """
+    Return the store holding analytics results, creating it on first use.
+
+    Returns
+    -------
+    LRUCache or django.core.cache.backends.base.BaseCache
+        The configured store.
+    """
+    global _backend
+    if _backend is None:
+        config = get_config()
+        if config['BACKEND'] == 'django':
+            _backend = caches[config.get('ALIAS', 'default')]
+        else:
+            _backend = LRUCache(config['MAX_ENTRIES'])
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    """
+    Drop the store when its configuration changes, e.g. in tests.
+    """
+    global _backend
+    if setting == 'HABIT_ANALYTICS_CACHE':
+        _backend = None
+
+
+def _version_key(user_id):
+    return f'habit:analytics:version:{user_id}'
+
+
+def user_version(user_id):
+    """
+    Return the current analytics version of a user.
+
+    A missing counter (never set, or evicted) is initialized from the clock so
+    that it can never match the version of an entry cached before the eviction.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user.
+
+    Returns
+    -------
+    int
+        The user's analytics version.
+    """
+    backend = get_backend()
+    version = backend.get(_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        backend.set(_version_key(user_id), version, timeout=None)
+    return version
+
+
+def bump_user_versions(user_ids):
+    """
+    Invalidate the cached analytics of the given users.
+
+    Parameters
+    ----------
+    user_ids : iterable
+        The IDs of the users whose analytics changed.
+    """
+    backend = get_backend()
+    for user_id in set(user_ids):
+        backend.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def _result_key(user_id, name):
+    return f'habit:analytics:{name}:{user_id}:{user_version(user_id)}'
+
+
+def cached_for_user(user_id, name, compute):
+    """
+    Return a user's cached analytics result, computing and storing it on a miss.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user.
+    name : str
+        The name of the result.
+    compute : callable
+        A function called without arguments to compute the result on a miss.
+        Its return value must be picklable when a Django cache backend is used.
+
+    Returns
+    -------
+    object
+        The cached or freshly computed result.
+    """
+    backend = get_backend()
+    key = _result_key(user_id, name)
+    value = backend.get(key)
+    if value is None:
+        value = compute()
+        backend.set(key, value, timeout=get_config()['TIMEOUT'])
+    return value
+
+
+async def acached_for_user(user_id, name, compute):
+    """
+    Asynchronous version of ``cached_for_user``.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user.
+    name : str
+        The name of the result.
+    compute : callable
+        A coroutine function called without arguments to compute the result on a miss.
+
+    Returns
+    -------
+    object
+        The cached or freshly computed result.
+    """
+    backend = get_backend()
+    key = await sync_to_async(_result_key)(user_id, name)
+    value = await sync_to_async(backend.get)(key)
+    if value is None:
+        value = await compute()
+        await sync_to_async(backend.set)(key, value, timeout=get_config()['TIMEOUT'])
+    return value
@@ -0,0 +1,12 @@
+"""
+Pooled database backends of the Habit application.
+
+Each backend is the Django backend of the same name with its connections
+checked out from and returned to a ``habit.db.pool.ConnectionPool``. Use one
+by setting the ``ENGINE`` of a database to ``habit.db.backends.mysql`` or
+``habit.db.backends.sqlite3``.
+
+No ODBC backend is shipped: pyodbc connections are already pooled by the ODBC
+driver manager (``pyodbc.pooling``, on by default). Another third-party backend
+can be pooled by mixing ``PooledDatabaseWrapperMixin`` into its ``DatabaseWrapper``.
+"""
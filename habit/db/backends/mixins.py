@@ -0,0 +1,67 @@
+"""
+Mixin pooling the connections of a Django database backend.
+
+Classes:
+    PooledDatabaseWrapperMixin: Check connections out of a ConnectionPool.
+"""
+
+from habit.db.pool import get_pool
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Check the connections of a ``DatabaseWrapper`` out of a ``ConnectionPool``.
+
+    The mixin goes before the backend's ``DatabaseWrapper`` in the bases of
+    the pooled wrapper. Closing the wrapper, which Django does at the end of
+    every request when ``CONN_MAX_AGE`` is 0, returns its connection to the
+    pool instead of closing it.
+
+    Attributes
+    ----------
+    health_check_query : str
+        The statement run on a connection when it is checked out.
+    """
+    health_check_query = 'SELECT 1'
+
+    @property
+    def pool(self):
+        """
+        The pool of the wrapper's database alias.
+        """
+        return get_pool(self.alias, self.settings_dict)
+
+    def check_pooled_connection(self, connection):
+        """
+        Raise if a pooled DB-API connection is no longer usable.
+
+        Parameters
+        ----------
+        connection : object
+            The DB-API connection.
+        """
+        cursor = connection.cursor()
+        try:
+            cursor.execute(self.health_check_query)
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        return self.pool.acquire(lambda: connect(conn_params), check=self.check_pooled_connection)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        # Django keeps the connection of a wrapper closed inside an atomic block,
+        # so it cannot be handed to another thread.
+        discard = self.in_atomic_block
+        if not discard and not self.autocommit:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+        with self.wrap_database_errors:
+            self.pool.release(connection, discard=discard)
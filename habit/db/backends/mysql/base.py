@@ -0,0 +1,16 @@
+"""
+MySQL backend with pooled connections.
+"""
+
+from django.db.backends.mysql import base
+from habit.db.backends.mixins import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    Django's MySQL ``DatabaseWrapper`` with its connections checked out of a pool.
+    """
+
+    def check_pooled_connection(self, connection):
+        # A round trip without a statement, which mysqlclient provides
+        connection.ping()
@@ -0,0 +1,14 @@
+"""
+SQLite backend with pooled connections.
+
+Mostly useful to exercise the pool without a database server.
+"""
+
+from django.db.backends.sqlite3 import base
+from habit.db.backends.mixins import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    Django's SQLite ``DatabaseWrapper`` with its connections checked out of a pool.
+    """
@@ -0,0 +1,392 @@
+"""
+Connection pooling for the database backends of the Habit application.
+
+Django opens a database connection per thread and, with the default
+``CONN_MAX_AGE`` of 0, closes it at the end of every request, so every request
+pays for the connection setup. The pooled backends of ``habit.db.backends``
+keep the closed connections in a per-process ``ConnectionPool`` instead, and
+hand them out to the next request of any thread.
+
+A pool is configured by the ``POOL`` key of a database in ``DATABASES``:
+
+    'POOL': {'SIZE': 10, 'TIMEOUT': 5, 'MAX_IDLE': 300,
+             'MAX_LIFETIME': 3600, 'HEALTH_CHECKS': True, 'REAP_INTERVAL': 60}
+
+``SIZE`` caps the open connections of the process, and a checkout waits up to
+``TIMEOUT`` seconds for one to be returned when they are all in use. Idle
+connections are closed after ``MAX_IDLE`` seconds and every connection after
+``MAX_LIFETIME`` seconds, by a background job running every ``REAP_INTERVAL``
+seconds. With ``HEALTH_CHECKS``, a connection is pinged when it is checked out
+and replaced if the ping fails.
+
+Classes:
+    ConnectionPool: A bounded pool of DB-API connections.
+    PoolTimeout: Raised when no connection is returned within the timeout.
+
+Functions:
+    get_pool: Return the pool of a database alias.
+    pool_stats: Return the metrics of every pool of the process.
+    close_pools: Close the idle connections of every pool and forget them.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from django.db.utils import OperationalError
+from habit.scheduler import PeriodicJob
+
+
+logger = logging.getLogger('habit.db')
+
+DEFAULT_POOL = {
+    'SIZE': 10,
+    'TIMEOUT': 5,
+    'MAX_IDLE': 300,
+    'MAX_LIFETIME': 3600,
+    'HEALTH_CHECKS': True,
+    'REAP_INTERVAL': 60,
+}
+
+
+class PoolTimeout(OperationalError):
+    """
+    Raised when no pooled connection is returned within the checkout timeout.
+    """
+
+
+class _Entry:
+    """
+    A pooled connection with its creation and return times.
+    """
+    __slots__ = ('connection', 'created', 'returned')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = self.returned = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of DB-API connections.
+
+    Attributes
+    ----------
+    size : int
+        The maximum number of open connections, idle or in use.
+    timeout : float
+        The number of seconds a checkout waits for a connection to be returned.
+    max_idle : float or None
+        The number of seconds after which an idle connection is closed.
+    max_lifetime : float or None
+        The number of seconds after which a connection is closed when returned.
+    health_checks : bool
+        Whether connections are pinged when checked out.
+    reap_interval : float or None
+        The number of seconds between two runs of ``reap`` by the background
+        job started with ``start_reaper``.
+    """
+
+    def __init__(self, size=10, timeout=5, max_idle=300, max_lifetime=3600, health_checks=True,
+                 reap_interval=60):
+        if size < 1:
+            raise ValueError('The pool size must be at least 1.')
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_checks = health_checks
+        self.reap_interval = reap_interval
+        self.pid = os.getpid()
+        self._reaper = None
+        # Idle connections, the most recently returned last
+        self._idle = deque()
+        # Connections checked out, by id of the DB-API connection
+        self._in_use = {}
+        self._opening = 0
+        self._condition = threading.Condition()
+        self._metrics = dict.fromkeys((
+            'checkouts', 'created', 'closed', 'reaped', 'health_check_failures',
+            'waits', 'timeouts'), 0)
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    @classmethod
+    def from_settings(cls, settings_dict):
+        """
+        Create a pool from the settings of a database.
+
+        Parameters
+        ----------
+        settings_dict : dict
+            An entry of ``DATABASES``, whose ``POOL`` key overrides ``DEFAULT_POOL``.
+
+        Returns
+        -------
+        ConnectionPool
+            The new pool.
+        """
+        options = {**DEFAULT_POOL, **(settings_dict.get('POOL') or {})}
+        return cls(size=options['SIZE'], timeout=options['TIMEOUT'],
+                   max_idle=options['MAX_IDLE'], max_lifetime=options['MAX_LIFETIME'],
+                   health_checks=options['HEALTH_CHECKS'],
+                   reap_interval=options['REAP_INTERVAL'])
+
+    def _expired(self, entry, now):
+        return ((self.max_idle is not None and now - entry.returned > self.max_idle)
+                or (self.max_lifetime is not None and now - entry.created > self.max_lifetime))
+
+    def _discard(self, connection):
+        self._metrics['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            logger.debug('Error closing a pooled connection.', exc_info=True)
+
+    def acquire(self, connect, check=None):
+        """
+        Check out a connection, opening one if the pool is not full.
+
+        Parameters
+        ----------
+        connect : callable
+            Opens a new DB-API connection.
+        check : callable, optional
+            Takes a connection and raises if it is not usable. Only called
+            when ``health_checks`` is set.
+
+        Returns
+        -------
+        object
+            The DB-API connection.
+
+        Raises
+        ------
+        PoolTimeout
+            If the pool is full and no connection is returned within ``timeout``.
+        """
+        deadline = None
+        waited = False
+        start = time.monotonic()
+        with self._condition:
+            self._metrics['checkouts'] += 1
+            while True:
+                entry = self._take_idle()
+                if entry is not None:
+                    break
+                if len(self._in_use) + self._opening < self.size:
+                    self._opening += 1
+                    break
+                if deadline is None:
+                    deadline = start + self.timeout
+                    waited = True
+                    self._metrics['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    if self._idle or len(self._in_use) + self._opening < self.size:
+                        continue
+                    self._metrics['timeouts'] += 1
+                    self._record_wait(start)
+                    raise PoolTimeout(f'No database connection was returned to the pool '
+                                      f'within {self.timeout} seconds ({self.size} in use).')
+            if waited:
+                self._record_wait(start)
+
+        if entry is not None and self.health_checks and check is not None:
+            try:
+                check(entry.connection)
+            except Exception:
+                with self._condition:
+                    self._metrics['health_check_failures'] += 1
+                    del self._in_use[id(entry.connection)]
+                    self._discard(entry.connection)
+                    self._opening += 1
+                logger.info('Replacing a pooled connection that failed its health check.')
+                entry = None
+
+        if entry is None:
+            try:
+                entry = _Entry(connect())
+            except BaseException:
+                with self._condition:
+                    self._opening -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._opening -= 1
+                self._metrics['created'] += 1
+
+        with self._condition:
+            self._in_use[id(entry.connection)] = entry
+        return entry.connection
+
+    def _take_idle(self):
+        now = time.monotonic()
+        while self._idle:
+            entry = self._idle.pop()
+            if not self._expired(entry, now):
+                self._in_use[id(entry.connection)] = entry
+                return entry
+            self._metrics['reaped'] += 1
+            self._discard(entry.connection)
+        return None
+
+    def _record_wait(self, start):
+        waited = time.monotonic() - start
+        self._wait_time += waited
+        self._max_wait = max(self._max_wait, waited)
+        logger.debug('Waited %.1f ms for a pooled connection.', waited * 1000)
+
+    def release(self, connection, discard=False):
+        """
+        Return a checked-out connection to the pool.
+
+        Parameters
+        ----------
+        connection : object
+            The DB-API connection returned by ``acquire``.
+        discard : bool, optional
+            Close the connection instead of keeping it, e.g. after an error.
+        """
+        with self._condition:
+            entry = self._in_use.pop(id(connection), None)
+            if entry is None:
+                self._discard(connection)
+                return
+            now = time.monotonic()
+            if discard or os.getpid() != self.pid or self._expired(entry, now):
+                self._discard(connection)
+            else:
+                entry.returned = now
+                self._idle.append(entry)
+            self._condition.notify()
+
+    def reap(self):
+        """
+        Close the idle connections past ``max_idle`` or ``max_lifetime``.
+
+        Returns
+        -------
+        int
+            The number of connections closed.
+        """
+        with self._condition:
+            now = time.monotonic()
+            keep = deque(entry for entry in self._idle if not self._expired(entry, now))
+            expired = [entry for entry in self._idle if self._expired(entry, now)]
+            self._idle = keep
+            for entry in expired:
+                self._metrics['reaped'] += 1
+                self._discard(entry.connection)
+            return len(expired)
+
+    def start_reaper(self):
+        """
+        Run ``reap`` every ``reap_interval`` seconds on a daemon thread.
+
+        Idle connections are otherwise only expired when they reach the top of
+        the pool at checkout, so the ones below never would.
+
+        Returns
+        -------
+        PeriodicJob or None
+            The reaper, or None if ``reap_interval`` is not set or nothing expires.
+        """
+        if self._reaper is None and self.reap_interval and \
+                (self.max_idle is not None or self.max_lifetime is not None):
+            self._reaper = PeriodicJob(self.reap, self.reap_interval, name='db-pool-reaper')
+            self._reaper.start()
+        return self._reaper
+
+    def close(self):
+        """
+        Close the idle connections and stop the reaper. Checked-out connections
+        are closed when returned.
+        """
+        if self._reaper is not None:
+            self._reaper.stop()
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop().connection)
+            self.max_lifetime = 0
+
+    def stats(self):
+        """
+        Return the metrics of the pool.
+
+        Returns
+        -------
+        dict
+            The open, idle and in-use connections; the counts of checkouts,
+            connections created, closed and reaped, failed health checks, and
+            checkouts that waited or timed out; the total and maximum wait in
+            milliseconds.
+        """
+        with self._condition:
+            return {
+                'size': self.size,
+                'open': len(self._idle) + len(self._in_use),
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                **self._metrics,
+                'wait_time_ms': round(self._wait_time * 1000, 3),
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """
+    Return the pool of a database alias, creating it on first use.
+
+    A process forked after the pool was created gets a pool of its own, as
+    connections cannot be shared across processes. The reaper of a new pool
+    is started with it.
+
+    Parameters
+    ----------
+    alias : str
+        The database alias.
+    settings_dict : dict
+        The settings of the database.
+
+    Returns
+    -------
+    ConnectionPool
+        The pool of the alias.
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = ConnectionPool.from_settings(settings_dict)
+            pool.start_reaper()
+        return pool
+
+
+def pool_stats():
+    """
+    Return the metrics of every pool of the process.
+
+    Returns
+    -------
+    dict
+        The ``ConnectionPool.stats`` of each database alias.
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+def close_pools():
+    """
+    Close the idle connections of every pool of the process and forget the pools.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,170 @@
+"""
+Streaming export of a user's task journal.
+
+A user's habits, tasks, streaks and achievements are exported as CSV, one
+table per file, or as NDJSON, one JSON object per line tagged with its table,
+with every table in one file ('journal'). Exports are generators of text
+chunks that feed a ``StreamingHttpResponse`` or a file, so they never hold
+more than one page of rows in memory.
+
+Rows are read in pages of ``HABIT_EXPORT_CHUNK_SIZE`` rows by primary key
+(keyset pagination), each page being a short indexed query. Unlike
+``QuerySet.iterator()``, this keeps memory constant on MySQL, whose client
+library buffers whole result sets, and holds no cursor open while a slow
+client reads the response. Tasks are paged by their denormalized user, so a
+user with many small habits does not cost a query per habit.
+
+Functions:
+    table_pages: Yield the rows of a user's table in pages.
+    export_journal: Return the chunks of a user's export.
+"""
+
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Achievement, Habit, Streak, TaskTracker
+from .routers import analytics_database
+
+
+# Exported columns of each table, the primary key first
+EXPORT_TABLES = {
+    'habits': ('id', 'name', 'frequency', 'period', 'goal', 'num_of_tasks', 'notes',
+               'creation_time', 'start_date', 'completion_date'),
+    'tasks': ('id', 'habit_id', 'task_number', 'task_status', 'start_date', 'due_date',
+              'task_completion_date'),
+    'streaks': ('id', 'habit_id', 'num_of_completed_tasks', 'num_of_failed_tasks',
+                'longest_streak', 'current_streak'),
+    'achievements': ('id', 'habit_id', 'streak_length', 'title', 'date'),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Every table at once, only exported as NDJSON
+JOURNAL = 'journal'
+
+
+def _pages(queryset, fields, chunk_size):
+    """
+    Yield the rows of a queryset as lists of at most ``chunk_size`` tuples, by primary key.
+    """
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        page = list(page.order_by('pk').values_list(*fields)[:chunk_size])
+        if page:
+            yield page
+        if len(page) < chunk_size:
+            return
+        last = page[-1][0]
+
+
+def table_pages(user_id, table, chunk_size=None, using=None):
+    """
+    Yield the rows of a user's table in pages.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user whose rows are exported.
+    table : str
+        One of the ``EXPORT_TABLES`` names.
+    chunk_size : int, optional
+        The number of rows per page. Defaults to ``HABIT_EXPORT_CHUNK_SIZE``.
+    using : str, optional
+        The database alias read. Defaults to the routed database.
+
+    Yields
+    ------
+    list
+        Tuples of the ``EXPORT_TABLES`` columns of the table.
+    """
+    chunk_size = chunk_size or getattr(settings, 'HABIT_EXPORT_CHUNK_SIZE', 2000)
+    fields = EXPORT_TABLES[table]
+    habits = Habit.objects.using(using).filter(user_id=user_id)
+    if table == 'habits':
+        yield from _pages(habits, fields, chunk_size)
+    elif table == 'tasks':
+        yield from _pages(TaskTracker.objects.using(using).filter(user_id=user_id),
+                          fields, chunk_size)
+    else:
+        model = Streak if table == 'streaks' else Achievement
+        yield from _pages(model.objects.using(using).filter(habit__user_id=user_id),
+                          fields, chunk_size)
+
+
+class _Echo:
+    """
+    A file-like object returning what is written to it, for ``csv.writer``.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(user_id, table, chunk_size, using):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_TABLES[table])
+    for page in table_pages(user_id, table, chunk_size, using):
+        yield ''.join(writer.writerow([_csv_value(value) for value in row]) for row in page)
+
+
+def _ndjson_chunks(user_id, tables, chunk_size, using):
+    for table in tables:
+        fields = EXPORT_TABLES[table]
+        for page in table_pages(user_id, table, chunk_size, using):
+            yield ''.join(json.dumps({'table': table, **dict(zip(fields, row))},
+                                     cls=DjangoJSONEncoder) + '\n' for row in page)
+
+
+def export_journal(user_id, table=JOURNAL, export_format='ndjson', chunk_size=None):
+    """
+    Return the chunks of a user's export.
+
+    The export reads from the analytics database of the user.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user whose data is exported.
+    table : str, optional
+        One of the ``EXPORT_TABLES`` names, or 'journal' for every table.
+        Defaults to 'journal'.
+    export_format : str, optional
+        'csv' or 'ndjson'. Defaults to 'ndjson'.
+    chunk_size : int, optional
+        The number of rows read per query. Defaults to ``HABIT_EXPORT_CHUNK_SIZE``.
+
+    Returns
+    -------
+    generator
+        The text chunks of the export, one per page of rows.
+
+    Raises
+    ------
+    ValueError
+        If the table or the format is unknown, or if the journal is requested as CSV.
+    """
+    if table != JOURNAL and table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table '{table}'.")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format '{export_format}'.")
+    using = analytics_database(user_id)
+    if export_format == 'csv':
+        if table == JOURNAL:
+            raise ValueError('The journal is only exported as NDJSON; export its tables '
+                             'one by one as CSV.')
+        return _csv_chunks(user_id, table, chunk_size, using)
+    tables = list(EXPORT_TABLES) if table == JOURNAL else [table]
+    return _ndjson_chunks(user_id, tables, chunk_size, using)
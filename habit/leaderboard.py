@@ -0,0 +1,48 @@
+"""
+Streak leaderboards for the Habit application.
+
+This module answers "which habits have the longest streaks" with top-K queries,
+scoped to one user or to the whole installation. The installation-wide query
+walks the streak rank indexes; a user's query sorts the streaks of their
+habits, found through the index on the habit owner, which are few.
+
+Functions:
+    top_habit_ids: Return the IDs of the habits with the longest streaks.
+"""
+
+from habit.models import Streak
+
+
+LEADERBOARD_FIELDS = ('current_streak', 'longest_streak')
+
+
+def top_habit_ids(field, k=1, user_id=None):
+    """
+    Return the IDs of the habits with the longest streaks.
+
+    Parameters
+    ----------
+    field : str
+        The Streak field ranked, 'current_streak' or 'longest_streak'.
+    k : int, optional
+        The number of habits to return. Defaults to 1.
+    user_id : int, optional
+        The ID of the user whose habits are ranked. Defaults to every user.
+
+    Returns
+    -------
+    list
+        The habit IDs, ordered by descending streak then by habit ID.
+
+    Raises
+    ------
+    ValueError
+        If ``field`` is not a leaderboard field.
+    """
+    if field not in LEADERBOARD_FIELDS:
+        raise ValueError(f"Unknown leaderboard field '{field}'.")
+
+    streaks = Streak.objects.all()
+    if user_id is not None:
+        streaks = streaks.filter(habit__user_id=user_id)
+    return list(streaks.order_by(f'-{field}', 'habit_id').values_list('habit_id', flat=True)[:k])
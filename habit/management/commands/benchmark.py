@@ -0,0 +1,106 @@
+"""
+Management command benchmarking the hot paths on a synthetic dataset.
+
+The dataset is generated in a throwaway test database, so the configured
+database is never written to.
+
+Usage:
+    python manage.py benchmark --users 50 --habits 5 --output bench.json
+    python manage.py benchmark --baseline bench.json --threshold 0.15
+    python manage.py benchmark --concurrency 20
+"""
+
+import json
+import platform
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+from django.utils import timezone
+from habit.db.pool import pool_stats
+from habit.benchmark import compare_results, generate_dataset, run_benchmark, \
+    run_concurrency_benchmark
+
+
+class Command(BaseCommand):
+    """
+    Time the hot paths of the application and report latency percentiles as JSON.
+    """
+    help = 'Time the hot paths of the application and report latency percentiles as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Number of synthetic users.')
+        parser.add_argument('--habits', type=int, default=5, help='Number of habits per user.')
+        parser.add_argument('--days', type=int, default=60,
+                            help='Maximum age in days of the generated habits.')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Number of timed calls per endpoint.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the data generator.')
+        parser.add_argument('--output', help='File the JSON results are written to. '
+                                             'Defaults to standard output.')
+        parser.add_argument('--baseline', help='JSON results of a previous run to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Tolerated relative slowdown against the baseline.')
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help='Also compare the sync and async views of the home and analysis '
+                                 'pages with this many concurrent requests. Off when 0 (default).')
+
+    def handle(self, *args, **options):
+        for name in ('users', 'habits', 'repeat'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be at least 1.')
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)['endpoints']
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            users = generate_dataset(options['users'], options['habits'],
+                                     options['days'], seed=options['seed'])
+            endpoints = run_benchmark(users, options['repeat'])
+            concurrency = None
+            if options['concurrency'] > 0:
+                concurrency = run_concurrency_benchmark(users, options['repeat'],
+                                                        options['concurrency'])
+            pools = pool_stats()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        results = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'users': options['users'],
+                'habits_per_user': options['habits'],
+                'history_days': options['days'],
+                'repeat': options['repeat'],
+                'seed': options['seed'],
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+            },
+            'endpoints': endpoints,
+        }
+        if pools:
+            results['meta']['connection_pools'] = pools
+        if concurrency is not None:
+            results['meta']['concurrency'] = options['concurrency']
+            results['concurrency'] = concurrency
+        report = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+        if baseline is not None:
+            regressions = compare_results(endpoints, baseline, options['threshold'])
+            for name, metric, base, value in regressions:
+                self.stderr.write(f'{name} {metric}: {base:.2f} ms -> {value:.2f} ms')
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against the baseline.')
+            self.stderr.write('No regression against the baseline.')
@@ -0,0 +1,50 @@
+"""
+Management command exporting a user's task journal.
+
+Usage:
+    python manage.py export_journal alice --output alice.ndjson
+    python manage.py export_journal alice --table tasks --format csv --output tasks.csv
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from habit.export import EXPORT_FORMATS, EXPORT_TABLES, JOURNAL, export_journal
+
+
+class Command(BaseCommand):
+    """
+    Export a user's habits, tasks, streaks and achievements as CSV or NDJSON.
+    """
+    help = "Export a user's habits, tasks, streaks and achievements as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='The user whose journal is exported.')
+        parser.add_argument('--table', default=JOURNAL, choices=[JOURNAL, *EXPORT_TABLES],
+                            help='Table to export. Defaults to every table, as NDJSON only.')
+        parser.add_argument('--format', default='ndjson', choices=list(EXPORT_FORMATS),
+                            help='Output format. Defaults to ndjson.')
+        parser.add_argument('--chunk-size', type=int,
+                            help='Rows read per query. Defaults to HABIT_EXPORT_CHUNK_SIZE.')
+        parser.add_argument('--output', help='File the export is written to. '
+                                             'Defaults to standard output.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        try:
+            user_id = User.objects.values_list('id', flat=True).get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['username']}'.")
+        try:
+            chunks = export_journal(user_id, options['table'], options['format'],
+                                    options['chunk_size'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
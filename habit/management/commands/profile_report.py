@@ -0,0 +1,60 @@
+"""
+Management command aggregating the profiles written by ProfilingMiddleware.
+
+Usage:
+    python manage.py profile_report
+    python manage.py profile_report --endpoint habit-home --top 20
+    python manage.py profile_report --collapsed flamegraphs/
+"""
+
+import io
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from habit.profiling import category_breakdown, collapsed_stacks, get_profile_dir, load_profiles
+
+
+class Command(BaseCommand):
+    """
+    Report where the time of each profiled endpoint goes.
+    """
+    help = 'Report where the time of each profiled endpoint goes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Profile directory. Defaults to HABIT_PROFILE_DIR.')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='URL name to report. Repeat for several; defaults to every endpoint.')
+        parser.add_argument('--top', type=int, default=10,
+                            help='Number of functions listed by cumulative time.')
+        parser.add_argument('--collapsed',
+                            help='Directory to write one <url name>.folded collapsed-stack file '
+                                 'per endpoint to, for flamegraph tools.')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or get_profile_dir()
+        profiles = load_profiles(directory)
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - set(profiles)
+            if unknown:
+                raise CommandError(f'No profiles for: {", ".join(sorted(unknown))}.')
+            profiles = {name: profiles[name] for name in options['endpoints']}
+        if not profiles:
+            raise CommandError(f'No profiles found in {directory}.')
+
+        for name, (count, stats) in profiles.items():
+            total = stats.total_tt
+            self.stdout.write(f'{name}: {count} request(s), '
+                              f'{total * 1000 / count:.1f} ms per request')
+            for category, seconds in category_breakdown(stats).items():
+                share = seconds / total * 100 if total else 0
+                self.stdout.write(f'  {category:<10} {seconds * 1000 / count:8.1f} ms  {share:5.1f}%')
+
+            if options['top'] > 0:
+                stream = io.StringIO()
+                stats.stream = stream
+                stats.sort_stats('cumulative').print_stats(options['top'])
+                self.stdout.write(stream.getvalue())
+
+            if options['collapsed']:
+                output = Path(options['collapsed'])
+                output.mkdir(parents=True, exist_ok=True)
+                (output / f'{name}.folded').write_text('\n'.join(collapsed_stacks(stats)) + '\n')
@@ -0,0 +1,30 @@
+"""
+Management command recomputing Streak counters from the task history.
+
+Usage:
+    python manage.py rebuild_streaks
+    python manage.py rebuild_streaks --habit 12 --habit 13 --chunk-size 1000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from habit.streaks import rebuild_streaks
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the Streak table from TaskTracker in chunks of habits.
+    """
+    help = 'Rebuild the Streak table from TaskTracker in chunks of habits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--habit', type=int, action='append', dest='habit_ids',
+                            help='ID of a habit to rebuild. Repeat to rebuild several; '
+                                 'defaults to every habit.')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of habits loaded and saved together.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        rebuilt = rebuild_streaks(options['habit_ids'], options['chunk_size'])
+        self.stdout.write(f'{rebuilt} streak(s) rebuilt.')
@@ -0,0 +1,45 @@
+"""
+Management command recomputing the precomputed habit rankings.
+
+Usage:
+    python manage.py refresh_rankings
+    python manage.py refresh_rankings --period daily --profile struggled_most
+    python manage.py refresh_rankings --if-empty
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from habit.analytics import RANKING_PERIODS, ranking_profiles, refresh_habit_rankings
+from habit.models import HabitRanking
+
+
+class Command(BaseCommand):
+    """
+    Refresh the HabitRanking table for every period and weight profile.
+    """
+    help = 'Refresh the HabitRanking table for every period and weight profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', action='append', dest='periods',
+                            help='Period to rank. Repeat for several; defaults to '
+                                 + ', '.join(RANKING_PERIODS) + '.')
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            help='Weight profile to rank with. Repeat for several; '
+                                 'defaults to every profile.')
+        parser.add_argument('--if-empty', action='store_true',
+                            help='Only compute the rankings without any row yet, '
+                                 'e.g. after deploying a fresh installation.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['profiles'] or []) - set(ranking_profiles())
+        if unknown:
+            raise CommandError(f'Unknown weight profile(s): {", ".join(sorted(unknown))}.')
+        periods = options['periods'] or RANKING_PERIODS
+        profiles = options['profiles'] or ranking_profiles()
+        if not options['if_empty']:
+            written = refresh_habit_rankings(periods, profiles)
+        else:
+            ranked = set(HabitRanking.objects.values_list('period', 'profile').distinct())
+            written = sum(refresh_habit_rankings([period], [profile])
+                          for period in periods for profile in profiles
+                          if (period, profile) not in ranked)
+        self.stdout.write(f'{written} ranking row(s) written.')
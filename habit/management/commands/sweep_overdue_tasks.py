@@ -0,0 +1,76 @@
+"""
+Management command sweeping overdue tasks for every user.
+
+Usage:
+    python manage.py sweep_overdue_tasks
+    python manage.py sweep_overdue_tasks --interval 300 --workers 4
+    python manage.py sweep_overdue_tasks --shards 4 --shard 2
+"""
+
+import multiprocessing
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from habit.analytics import sweep_overdue_tasks
+
+
+def _sweep_shard(args):
+    """
+    Sweep one shard of users in a worker process.
+    """
+    shard, num_shards, users_per_batch = args
+    try:
+        return sweep_overdue_tasks(shard, num_shards, users_per_batch)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    Fail overdue tasks and update achievements and streaks for all users.
+    """
+    help = 'Fail overdue tasks and update achievements and streaks for all users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Seconds between sweeps. Sweep once when 0 (default).')
+        parser.add_argument('--shard', type=int, default=0,
+                            help='Shard of users handled by this process.')
+        parser.add_argument('--shards', type=int, default=1,
+                            help='Total number of shards users are split into by id.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Sweep the shards of this process in parallel worker processes.')
+        parser.add_argument('--users-per-batch', type=int, default=None,
+                            help='Number of users swept per UPDATE.')
+
+    def handle(self, *args, **options):
+        shard, num_shards = options['shard'], options['shards']
+        workers = options['workers']
+        if not 0 <= shard < num_shards:
+            raise CommandError('--shard must be in the range [0, --shards).')
+        if workers < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        # Every worker takes one sub-shard of this process's shard
+        jobs = [(shard + i * num_shards, num_shards * workers, options['users_per_batch'])
+                for i in range(workers)]
+
+        while True:
+            failed = self.sweep(jobs)
+            self.stdout.write(f'{failed} overdue task(s) marked as failed.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    @staticmethod
+    def sweep(jobs):
+        """
+        Run one sweep over the given shards and return the number of failed tasks.
+        """
+        if len(jobs) == 1:
+            return sweep_overdue_tasks(*jobs[0])
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with multiprocessing.Pool(len(jobs)) as pool:
+            return sum(pool.map(_sweep_shard, jobs))
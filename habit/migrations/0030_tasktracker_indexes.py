@@ -0,0 +1,25 @@
+# Generated by Django 4.1 on 2026-10-17 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habit', '0029_remove_habit_num_of_completed_tasks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tasktracker',
+            index=models.Index(fields=['habit', 'task_status', 'due_date'], name='task_habit_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktracker',
+            index=models.Index(fields=['habit', 'task_number', 'start_date'], name='task_habit_number_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktracker',
+            index=models.Index(condition=models.Q(('task_status', 'In progress')), fields=['due_date'], name='task_inprogress_due_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_task_user(apps, schema_editor):
+    """
+    Copy each habit's owner onto its tasks.
+    """
+    Habit = apps.get_model('habit', 'Habit')
+    TaskTracker = apps.get_model('habit', 'TaskTracker')
+    owner = Habit.objects.filter(pk=models.OuterRef('habit_id')).values('user_id')[:1]
+    TaskTracker.objects.update(user_id=models.Subquery(owner))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('habit', '0030_tasktracker_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasktracker',
+            name='user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_task_user, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tasktracker',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RemoveIndex(
+            model_name='tasktracker',
+            name='task_habit_status_due_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tasktracker',
+            name='task_habit_number_start_idx',
+        ),
+        migrations.AddIndex(
+            model_name='tasktracker',
+            index=models.Index(fields=['user', 'task_status', 'due_date'], name='task_user_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktracker',
+            index=models.Index(fields=['user', 'task_number', 'start_date'], name='task_user_number_start_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.1 on 2026-10-17 06:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('habit', '0031_tasktracker_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=255)),
+                ('profile', models.CharField(max_length=255)),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField()),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='habit.habit')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='habitranking',
+            index=models.Index(fields=['user', 'profile', 'period', 'rank'], name='ranking_user_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habitranking',
+            index=models.Index(fields=['profile', 'period'], name='ranking_profile_period_idx'),
+        ),
+    ]
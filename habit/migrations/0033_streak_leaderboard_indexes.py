@@ -0,0 +1,21 @@
+# Generated by Django 4.1 on 2026-10-17 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habit', '0032_habitranking'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='streak',
+            index=models.Index(fields=['-current_streak', 'habit'], name='streak_current_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='streak',
+            index=models.Index(fields=['-longest_streak', 'habit'], name='streak_longest_rank_idx'),
+        ),
+    ]
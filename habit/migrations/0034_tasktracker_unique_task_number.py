@@ -0,0 +1,32 @@
+# Generated by Django 4.1 on 2026-10-17 12:00
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_tasks(apps, schema_editor):
+    """
+    Keep the first task of each habit and task number, so the constraint can be added.
+    """
+    TaskTracker = apps.get_model('habit', 'TaskTracker')
+    duplicates = (TaskTracker.objects.values('habit_id', 'task_number')
+                  .annotate(first=Min('pk'), count=models.Count('pk')).filter(count__gt=1))
+    for duplicate in duplicates:
+        TaskTracker.objects.filter(habit_id=duplicate['habit_id'],
+                                   task_number=duplicate['task_number']
+                                   ).exclude(pk=duplicate['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habit', '0033_streak_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_tasks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tasktracker',
+            constraint=models.UniqueConstraint(fields=('habit', 'task_number'), name='task_habit_number_uniq'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1 on 2026-10-17 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habit', '0034_tasktracker_unique_task_number'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tasktracker',
+            name='task_inprogress_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='tasktracker',
+            index=models.Index(fields=['task_status', 'due_date'], name='task_status_due_idx'),
+        ),
+    ]
@@ -1,10 +1,41 @@
+from collections import Counter, defaultdict
 from datetime import timedelta
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
+from .cache import bump_user_versions
+from .routers import pin_to_primary
 from .utils import convert_period_to_days
 
 
+class HabitQuerySet(models.QuerySet):
+    """
+    QuerySet of habits keeping the owner denormalized onto their tasks and rankings.
+    """
+
+    def update(self, **kwargs):
+        """
+        Update the habits, and the owner of their tasks and rankings on a reassignment.
+
+        A new owner is given as a ``User``, a user ID or an expression on the
+        ``User`` table; expressions on the habit itself are not supported.
+        """
+        owner = {key: kwargs[key] for key in ('user', 'user_id') if key in kwargs}
+        if not owner:
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            habit_ids = list(self.values_list('pk', flat=True))
+            updated = super().update(**kwargs)
+            for model in (TaskTracker, HabitRanking):
+                model.objects.using(self.db).filter(habit_id__in=habit_ids).update(**owner)
+        return updated
+
+    update.alters_data = True
+
+
 class Habit(models.Model):
     """
     Represents a habit tracked by the user.
@@ -44,6 +75,8 @@ class Habit(models.Model):
     completion_date = models.DateTimeField(null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = HabitQuerySet.as_manager()
+
 
     def save(self, *args, **kwargs):
         """
@@ -71,8 +104,35 @@ class Habit(models.Model):
         if not self.num_of_tasks:
             self.num_of_tasks = (self.goal // num_of_period) * self.frequency
 
+        # Keep the user_id denormalized onto TaskTracker and HabitRanking in sync
+        # on reassignment; queryset updates are synced by HabitQuerySet.update
+        reassigned = (not self._state.adding and
+                      self.user_id != getattr(self, '_loaded_user_id', self.user_id))
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if reassigned:
+                self.tasktracker_set.update(user_id=self.user_id)
+                self.rankings.update(user_id=self.user_id)
+        self._loaded_user_id = self.user_id
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the loaded owner so that ``save`` can detect a reassignment.
+        """
+        instance = super().from_db(db, field_names, values)
+        if 'user_id' in instance.__dict__:
+            instance._loaded_user_id = instance.user_id
+        return instance
 
-        super().save(*args, **kwargs)
+
+def _after_completion(user_id):
+    """
+    Invalidate a user's cached analytics and pin their analytics reads to the primary.
+    """
+    bump_user_versions([user_id])
+    pin_to_primary(user_id)
 
 
 class TaskTracker(models.Model):
@@ -83,6 +143,8 @@ class TaskTracker(models.Model):
     ----------
     habit : Habit
         The habit associated with the task.
+    user : User
+        The owner of the habit, denormalized so task queries skip the Habit join.
     start_date : DateTime
         The start date of the task.
     due_date : DateTime
@@ -96,15 +158,144 @@ class TaskTracker(models.Model):
     """
 
     habit = models.ForeignKey(Habit, on_delete=models.CASCADE)
+    # Indexed through the composite indexes below, which all lead with user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     start_date = models.DateTimeField(null=True, blank=True)
     due_date = models.DateTimeField(null=True, blank=True)
     task_number = models.IntegerField()
     task_status = models.CharField(max_length=255)
     task_completion_date = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        """
+        Indexes matching the hot task filters of the home page and the overdue sweep.
+        """
+        indexes = [
+            # due_today_tasks, active_tasks and the per-user overdue sweep
+            models.Index(fields=['user', 'task_status', 'due_date'],
+                         name='task_user_status_due_idx'),
+            # upcoming_tasks
+            models.Index(fields=['user', 'task_number', 'start_date'],
+                         name='task_user_number_start_idx'),
+            # Installation-wide overdue sweep. Not a partial index on the 'In progress'
+            # status, which MySQL does not support
+            models.Index(fields=['task_status', 'due_date'], name='task_status_due_idx'),
+        ]
+        constraints = [
+            # Concurrent extend_task_window calls cannot write a task twice
+            models.UniqueConstraint(fields=['habit', 'task_number'], name='task_habit_number_uniq'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Overrides the save method to copy the habit's owner onto the task.
+
+        Parameters
+        ----------
+        *args
+            Additional positional arguments.
+        **kwargs
+            Additional keyword arguments.
+        """
+        if self.user_id is None:
+            self.user_id = self.habit.user_id
+        super().save(*args, **kwargs)
+
+
+    @classmethod
+    def generate_tasks(cls, habit, start=1, stop=None, n=0):
+        """
+        Yields the unsaved tasks of a habit's schedule.
+
+        Any task of the schedule can be derived on demand from the habit's
+        start date, goal and number of tasks (itself derived from the goal,
+        frequency and period), so tasks do not have to be stored ahead of time.
+
+        Parameters
+        ----------
+        habit : Habit
+            The habit whose schedule is generated.
+        start : int, optional
+            The position in the schedule of the first task to yield. Defaults to 1.
+        stop : int, optional
+            The position in the schedule of the last task to yield.
+            Defaults to the habit's number of tasks.
+        n : int, optional
+            The offset added to task numbers. Defaults to 0.
+
+        Yields
+        ------
+        TaskTracker
+            The unsaved task at each position of the schedule.
+        """
+        if stop is None:
+            stop = habit.num_of_tasks
+
+        # Calculate the time between tasks
+        time_skip = cls.time_between_tasks(habit)
+        default = 'In progress'
+
+        # Task k starts where task k-1 is due
+        for k in range(start, stop + 1):
+            yield cls(habit=habit, user_id=habit.user_id,
+                      start_date=habit.start_date + time_skip * (k - 1),
+                      due_date=habit.start_date + time_skip * k,
+                      task_number=n + k, task_status=default)
+
+    @staticmethod
+    def time_between_tasks(habit):
+        """
+        Returns the time between two consecutive tasks of a habit.
+
+        Parameters
+        ----------
+        habit : Habit
+            The habit whose schedule is considered.
+
+        Returns
+        -------
+        timedelta
+            The time between the start (or due) dates of two consecutive tasks.
+        """
+        time_jump = habit.goal / habit.num_of_tasks
+        return timedelta(hours=time_jump*24)
+
+    @classmethod
+    def window_size(cls, habit, window=None, now=None):
+        """
+        Returns how many tasks of a habit fall inside the rolling window.
+
+        The window covers ``window`` periods of the habit past the current time
+        (or past the habit's start date for habits that have not started yet).
+
+        Parameters
+        ----------
+        habit : Habit
+            The habit whose schedule is considered.
+        window : int, optional
+            The number of periods to materialize. Defaults to the
+            ``HABIT_TASK_WINDOW_PERIODS`` setting; ``None`` covers the whole goal.
+        now : DateTime, optional
+            The current time. Defaults to ``timezone.now()``.
+
+        Returns
+        -------
+        int
+            The number of leading tasks whose start date is inside the window.
+        """
+        if window is None:
+            window = getattr(settings, 'HABIT_TASK_WINDOW_PERIODS', None)
+        if window is None:
+            return habit.num_of_tasks
+
+        now = now or timezone.now()
+        horizon = max(now, habit.start_date) + timedelta(
+            days=window * convert_period_to_days(habit.period))
+        in_window = (horizon - habit.start_date) // cls.time_between_tasks(habit) + 1
+        return min(habit.num_of_tasks, in_window)
 
     @classmethod
-    def create_tasks(cls, habit, n=0):
+    def create_tasks(cls, habit, n=0, batch_size=None, window=None):
         """
         Populates the TaskTracker table with tasks for a given habit.
 
@@ -112,34 +303,169 @@ class TaskTracker(models.Model):
         the TaskTracker table, assigning due dates and task numbers 
         based on the habit's creation time, goal, and frequency.
 
+        The schedule is built in memory and written with chunked
+        bulk inserts inside a single transaction, so the number of
+        round-trips depends on the batch size rather than on the goal.
+        In rolling-window mode only the tasks of the next ``window``
+        periods are written; ``extend_task_window`` adds the rest later.
+
         Parameters
         ----------
         habit : Habit
             The habit for which tasks are to be created.
         n : int, optional
             The starting task number. Defaults to 0.
+        batch_size : int, optional
+            The number of rows written per INSERT. Defaults to the
+            ``HABIT_TASK_BATCH_SIZE`` setting.
+        window : int, optional
+            The number of periods to materialize. Defaults to the
+            ``HABIT_TASK_WINDOW_PERIODS`` setting; ``None`` covers the whole goal.
+
+        Returns
+        -------
+        list
+            The created TaskTracker objects.
         """
+        if batch_size is None:
+            batch_size = getattr(settings, 'HABIT_TASK_BATCH_SIZE', 500)
 
-        # Calculate the time between tasks
-        time_jump = habit.goal / habit.num_of_tasks
-        time_skip = timedelta(hours=time_jump*24)
+        tasks = cls.generate_tasks(habit, stop=cls.window_size(habit, window), n=n)
+        with transaction.atomic():
+            return cls.objects.bulk_create(tasks, batch_size=batch_size, ignore_conflicts=True)
 
-        # Initialize start and due dates for tasks
-        due_date = start_date = habit.start_date
-        default= 'In progress'
+    @classmethod
+    def extend_task_window(cls, habits, window=None, batch_size=None):
+        """
+        Materializes the tasks that entered the rolling window since the last call.
 
-        # Increment the due_date and start_date by time_skip,
-        # skip the first iteration for start_date
-        for i in range(n+1, habit.num_of_tasks+(n+1)):
-            due_date += time_skip
-            if i == n+1:
-                current_start_date = start_date
-            else:
-                current_start_date += time_skip
-            cls.objects.create(habit=habit, due_date=due_date, task_number=i,
-                               task_status=default, start_date=current_start_date)
+        Parameters
+        ----------
+        habits : QuerySet
+            The habits whose windows should be topped up.
+        window : int, optional
+            The number of periods to materialize. Defaults to the
+            ``HABIT_TASK_WINDOW_PERIODS`` setting.
+        batch_size : int, optional
+            The number of rows written per INSERT. Defaults to the
+            ``HABIT_TASK_BATCH_SIZE`` setting.
+
+        Concurrent calls may compute the same tasks; the rows already written
+        by another call are skipped by the unique task number of each habit.
 
+        Returns
+        -------
+        list
+            The TaskTracker objects written, without their primary keys.
+        """
+        if window is None:
+            window = getattr(settings, 'HABIT_TASK_WINDOW_PERIODS', None)
+        if window is None:
+            return []
+        if batch_size is None:
+            batch_size = getattr(settings, 'HABIT_TASK_BATCH_SIZE', 500)
+
+        now = timezone.now()
+        # Select by missing tasks rather than by end date, so a habit that ended
+        # before its window caught up still gets its remaining tasks, to be failed
+        habits = habits.annotate(materialized=models.Max('tasktracker__task_number')).filter(
+            models.Q(materialized__isnull=True) | models.Q(materialized__lt=F('num_of_tasks')))
+
+        tasks = []
+        for habit in habits:
+            tasks.extend(cls.generate_tasks(habit, start=(habit.materialized or 0) + 1,
+                                            stop=cls.window_size(habit, window, now)))
+
+        with transaction.atomic():
+            return cls.objects.bulk_create(tasks, batch_size=batch_size, ignore_conflicts=True)
+
+
+    @classmethod
+    def complete_task(cls, task_id, habit_id, user_id):
+        """
+        Marks a task as completed and records it on the habit's streak.
+
+        The task is only completed if it belongs to the user and is not already
+        resolved, so a retried or duplicated request is a no-op. The task and
+        streak updates run in one transaction with a fixed number of queries.
+        The user's analytics reads are then pinned to the primary database.
+
+        Parameters
+        ----------
+        task_id : int
+            The ID of the task to complete.
+        habit_id : int
+            The ID of the habit the task belongs to.
+        user_id : int
+            The ID of the user completing the task.
 
+        Returns
+        -------
+        Streak or None
+            The updated streak, or None if no task was completed.
+        """
+        with transaction.atomic():
+            completed = cls.objects.filter(
+                id=task_id, habit_id=habit_id, user_id=user_id
+                ).exclude(task_status__in=['Completed', 'Failed']
+                ).update(task_status='Completed', task_completion_date=timezone.now())
+            if not completed:
+                return None
+            # After the commit, so no concurrent read caches the data being replaced
+            transaction.on_commit(lambda: _after_completion(user_id))
+
+            Streak.record_completion(habit_id)
+            streak = Streak.objects.select_related('habit').get(habit_id=habit_id)
+            Achievement.rewards_streaks(streak.habit, streak)
+        return streak
+
+    @classmethod
+    def complete_tasks(cls, user_id, task_ids):
+        """
+        Marks several tasks of a user as completed in one transaction.
+
+        The tasks are validated in one query: only the user's tasks that are not
+        already resolved are completed, the others are ignored. Streaks are then
+        incremented per habit with one UPDATE, and the milestones reached by
+        every intermediate streak length are rewarded with one bulk insert.
+        The user's analytics reads are then pinned to the primary database.
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the user completing the tasks.
+        task_ids : list
+            The IDs of the tasks to complete.
+
+        Returns
+        -------
+        tuple
+            The IDs of the completed tasks, the updated Streak objects and the
+            created Achievement objects.
+        """
+        with transaction.atomic():
+            tasks = list(cls.objects.select_for_update().filter(
+                id__in=list(task_ids), user_id=user_id
+                ).exclude(task_status__in=['Completed', 'Failed']
+                ).order_by('id').values_list('id', 'habit_id'))
+            if not tasks:
+                return [], [], []
+            completed_ids = [task_id for task_id, _ in tasks]
+            cls.objects.filter(id__in=completed_ids).update(
+                task_status='Completed', task_completion_date=timezone.now())
+            # After the commit, so no concurrent read caches the data being replaced
+            transaction.on_commit(lambda: _after_completion(user_id))
+
+            completions = Counter(habit_id for _, habit_id in tasks)
+            Streak.record_completions([habit_id for _, habit_id in tasks])
+            streaks = list(Streak.objects.select_related('habit').filter(
+                habit_id__in=list(completions)).order_by('habit_id'))
+            # Each completion may have crossed a milestone, not only the last one
+            reached = [(streak.habit, length) for streak in streaks
+                       for length in range(streak.current_streak - completions[streak.habit_id] + 1,
+                                           streak.current_streak + 1)]
+            achievements = Achievement.reward_milestones(reached)
+        return completed_ids, streaks, achievements
 
     @classmethod
     def update_failed_tasks(cls, user_id):
@@ -161,19 +487,115 @@ class TaskTracker(models.Model):
                 - A list of habit IDs that have tasks updated to 'Failed'.
                 - A list of task IDs that have been updated to 'Failed'.
         """
-        updated_habit_ids = []
-        updated_task_ids = []
-        tasks_to_update = cls.objects.filter(habit__user_id=user_id,
-                                            due_date__lt=timezone.now(),
-                                            task_status='In progress')
-        for task in tasks_to_update:
-            task.task_status = 'Failed'
-            task.task_completion_date = task.due_date
-            task.save()
-            updated_habit_ids.append(task.habit_id)
-            updated_task_ids.append(task.id)
+        return cls.fail_overdue_tasks([user_id])
+
+    @classmethod
+    def fail_overdue_tasks(cls, user_ids, batch_size=None):
+        """
+        Marks every overdue 'In progress' task of the given users as 'Failed'.
+
+        The sweep is set-based: the status flip and ``task_completion_date = due_date``
+        are applied by a single UPDATE. On backends that support ``UPDATE ... RETURNING``
+        (PostgreSQL, SQLite >= 3.35) the affected ids come back from that same statement.
+        Elsewhere the overdue rows are locked and updated in bounded batches.
+
+        Only rows flipped by this call are reported, so concurrent sweeps never
+        report the same task twice.
+
+        Parameters
+        ----------
+        user_ids : list
+            The IDs of the users whose overdue tasks should be failed.
+        batch_size : int, optional
+            The number of rows handled per batch on the fallback path.
+            Defaults to the ``HABIT_SWEEP_BATCH_SIZE`` setting.
+
+        Returns
+        -------
+        Tuple[List[int], List[int]]
+            A tuple containing two lists:
+                - A list of habit IDs, one entry per task updated to 'Failed'.
+                - A list of task IDs that have been updated to 'Failed'.
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return ([], [])
+
+        now = timezone.now()
+        if connection.vendor in ('postgresql', 'sqlite') and \
+                connection.features.can_return_columns_from_insert:
+            rows = cls._fail_overdue_returning(user_ids, now)
+        else:
+            rows = cls._fail_overdue_batched(user_ids, now, batch_size)
+
+        rows.sort()
+        updated_task_ids = [task_id for task_id, _, _ in rows]
+        updated_habit_ids = [habit_id for _, habit_id, _ in rows]
+
+        # Invalidate the cached analytics of the users who had tasks failed, once committed
+        failed_user_ids = {user_id for _, _, user_id in rows}
+        transaction.on_commit(lambda: bump_user_versions(failed_user_ids))
         return (updated_habit_ids, updated_task_ids)
 
+    @classmethod
+    def _fail_overdue_returning(cls, user_ids, now):
+        """
+        Fails overdue tasks with one ``UPDATE ... RETURNING`` statement.
+
+        Returns
+        -------
+        list
+            A list of ``(task_id, habit_id, user_id)`` tuples.
+        """
+        qn = connection.ops.quote_name
+        opts = cls._meta
+        status = qn(opts.get_field('task_status').column)
+        due_date = qn(opts.get_field('due_date').column)
+        placeholders = ', '.join(['%s'] * len(user_ids))
+
+        sql = (
+            f'UPDATE {qn(opts.db_table)} '
+            f'SET {status} = %s, {qn(opts.get_field("task_completion_date").column)} = {due_date} '
+            f'WHERE {qn(opts.get_field("user").column)} IN ({placeholders}) '
+            f'AND {status} = %s AND {due_date} < %s '
+            f'RETURNING {qn(opts.pk.column)}, {qn(opts.get_field("habit").column)}, '
+            f'{qn(opts.get_field("user").column)}'
+        )
+        params = ['Failed', *user_ids, 'In progress', connection.ops.adapt_datetimefield_value(now)]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [tuple(row) for row in cursor.fetchall()]
+
+    @classmethod
+    def _fail_overdue_batched(cls, user_ids, now, batch_size=None):
+        """
+        Fails overdue tasks in locked batches of at most ``batch_size`` rows.
+
+        Returns
+        -------
+        list
+            A list of ``(task_id, habit_id, user_id)`` tuples.
+        """
+        if batch_size is None:
+            batch_size = getattr(settings, 'HABIT_SWEEP_BATCH_SIZE', 1000)
+
+        overdue = cls.objects.filter(user_id__in=user_ids,
+                                     due_date__lt=now,
+                                     task_status='In progress').order_by('id')
+        rows = []
+        with transaction.atomic():
+            while True:
+                batch = list(overdue.select_for_update().values_list(
+                    'id', 'habit_id', 'user_id')[:batch_size])
+                if not batch:
+                    break
+                cls.objects.filter(id__in=[task_id for task_id, _, _ in batch]).update(
+                    task_status='Failed', task_completion_date=F('due_date'))
+                rows.extend(batch)
+                if len(batch) < batch_size:
+                    break
+        return rows
+
 
 class Streak(models.Model):
     """
@@ -198,6 +620,15 @@ class Streak(models.Model):
     longest_streak = models.IntegerField(default=0)
     current_streak = models.IntegerField(default=0)
 
+    class Meta:
+        """
+        Indexes matching the streak leaderboards, best streak first.
+        """
+        indexes = [
+            models.Index(fields=['-current_streak', 'habit'], name='streak_current_rank_idx'),
+            models.Index(fields=['-longest_streak', 'habit'], name='streak_longest_rank_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         """
         Overrides the default save method to update the longest streak.
@@ -240,6 +671,35 @@ class Streak(models.Model):
         streak.num_of_completed_tasks = completed_num
         streak.save()
 
+    @classmethod
+    def record_completion(cls, habit_id, count=1):
+        """
+        Atomically records completed tasks on a habit's streak.
+
+        Increments the current streak and the number of completed tasks and raises
+        the longest streak when needed, all in one conditional UPDATE, so
+        concurrent completions never lose an increment.
+
+        Parameters
+        ----------
+        habit_id : int
+            The ID of the habit whose streak is updated.
+        count : int, optional
+            The number of completed tasks to record. Defaults to 1.
+
+        Returns
+        -------
+        int
+            The number of Streak rows updated.
+        """
+        # longest_streak must be assigned first: MySQL evaluates SET assignments
+        # left to right against the updated row, other backends against the old one.
+        return cls.objects.filter(habit_id=habit_id).update(
+            longest_streak=Greatest('longest_streak', F('current_streak') + count),
+            current_streak=F('current_streak') + count,
+            num_of_completed_tasks=F('num_of_completed_tasks') + count,
+        )
+
     @classmethod
     def update_streak(cls, habit_ids):
         """
@@ -247,19 +707,74 @@ class Streak(models.Model):
 
         This class method updates the streak information for the specified habit IDs.
         It resets the current streak to zero and increments the number of failed tasks
-        for each habit.
+        of each habit by the number of times it appears in ``habit_ids``.
+
+        Failures are counted per habit and applied with a single set-based UPDATE,
+        so the cost depends on the number of habits rather than on the number of
+        failed tasks.
+
+        Parameters
+        ----------
+        habit_ids : list
+            A list of habit IDs to update streak information for, one entry per failed task.
+
+        Returns
+        -------
+        int
+            The number of Streak rows updated.
+        """
+        failures = Counter(habit_ids)
+        if not failures:
+            return 0
+
+        return cls.objects.filter(habit_id__in=list(failures)).update(
+            num_of_failed_tasks=F('num_of_failed_tasks') + cls._increment(failures),
+            current_streak=0,
+        )
+
+    @classmethod
+    def record_completions(cls, habit_ids):
+        """
+        Atomically records completed tasks on the streaks of several habits.
+
+        Each habit's current streak and number of completed tasks are incremented
+        by the number of times it appears in ``habit_ids``, and its longest streak
+        raised when needed, with a single set-based UPDATE.
 
         Parameters
         ----------
         habit_ids : list
-            A list of habit IDs to update streak information for.
+            A list of habit IDs, one entry per completed task.
+
+        Returns
+        -------
+        int
+            The number of Streak rows updated.
+        """
+        completions = Counter(habit_ids)
+        if not completions:
+            return 0
+
+        increment = cls._increment(completions)
+        # longest_streak must be assigned first, see record_completion
+        return cls.objects.filter(habit_id__in=list(completions)).update(
+            longest_streak=Greatest('longest_streak', F('current_streak') + increment),
+            current_streak=F('current_streak') + increment,
+            num_of_completed_tasks=F('num_of_completed_tasks') + increment,
+        )
+
+    @staticmethod
+    def _increment(counts):
         """
+        Returns a CASE expression mapping each habit to its count.
 
-        for habit_id in habit_ids:
-            habit_streak = cls.objects.get(habit_id=habit_id)
-            habit_streak.num_of_failed_tasks += 1
-            habit_streak.current_streak = 0
-            habit_streak.save()
+        Habits are grouped by count to keep the expression short.
+        """
+        habits_by_count = defaultdict(list)
+        for habit_id, count in counts.items():
+            habits_by_count[count].append(habit_id)
+        return Case(*[When(habit_id__in=ids, then=Value(count))
+                      for count, ids in habits_by_count.items()], default=Value(0))
 
 
 class Achievement(models.Model):
@@ -282,6 +797,12 @@ class Achievement(models.Model):
     title = models.CharField(max_length=255)
     date = models.DateTimeField(null=True, blank=True)
 
+    # Streak milestones keyed by period, then by the streak length in periods
+    MILESTONES = {
+        'daily': {7: '7-Day Streak', 14: '14-Day Streak', 30: '30-Day Streak'},
+        'weekly': {1: '1-Week Streak', 2: "2-Week's Streak", 4: "4-Week's Streak"},
+        'monthly': {1: '1-Month Streak', 2: "2-Month's Streak", 4: "4-Month's Streak"},
+    }
 
     @classmethod
     def update_achievements(cls, tasks):
@@ -289,34 +810,114 @@ class Achievement(models.Model):
         Update achievements for habits when a user breaks their streak.
 
         This method updates the achievements associated with habits 
-        when a user fails to maintain their streak. It iterates through 
-        the provided tasks and creates an Achievement object for each 
-        habit where the streak has been broken.
+        when a user fails to maintain their streak. It resolves the status
+        of the task preceding each provided task and the streak of each
+        habit in batch, then creates an Achievement object for each habit
+        where the streak has been broken with a single bulk insert.
 
         Parameters
         ----------
         tasks : QuerySet
-            A queryset containing TaskTracker objects representing the tasks associated with habits.
+            A queryset containing TaskTracker objects representing the first
+            failed task of each habit.
+
+        Returns
+        -------
+        list
+            The created Achievement objects.
         """
+        tasks = list(tasks)
+        if not tasks:
+            return []
+
+        # Status of the previous task of each habit, keyed by (habit_id, task_number)
+        previous = Q()
         for task in tasks:
-            # Check if the task number is greater than 1 to avoid index out of range error
             if task.task_number > 1:
-                prev_task = TaskTracker.objects.get(task_number=task.task_number - 1)
-                # Check if the previous task was failed to avoid repeating Break habit title
-                if prev_task.task_status == 'Failed':
-                    continue
-            streak = task.habit.streak.get()
+                previous |= Q(habit_id=task.habit_id, task_number=task.task_number - 1)
+        previous_status = {}
+        if previous:
+            previous_status = {
+                (habit_id, task_number): status
+                for habit_id, task_number, status in TaskTracker.objects.filter(previous).values_list(
+                    'habit_id', 'task_number', 'task_status')
+            }
+
+        streaks = {streak.habit_id: streak for streak in
+                   Streak.objects.filter(habit_id__in={task.habit_id for task in tasks})}
+
+        title = 'Break The Habit'
+        achievements = []
+        for task in tasks:
+            # Check if the previous task was failed to avoid repeating Break habit title
+            if previous_status.get((task.habit_id, task.task_number - 1)) == 'Failed':
+                continue
+            streak = streaks.get(task.habit_id)
             # Check if the streak is not None and its current_streak is not 0
             if streak and streak.current_streak != 0:
-                title = 'Break The Habit'
-                # Assign the streak length from the fetched streak information
-                streak_length = streak.current_streak if streak else 0
-                cls.objects.create(habit=task.habit, date=task.due_date,
-                                    title=title, streak_length=streak_length)
+                achievements.append(cls(habit_id=task.habit_id, date=task.due_date,
+                                        title=title, streak_length=streak.current_streak))
+        if achievements:
+            achievements = cls.objects.bulk_create(achievements)
+        return achievements
+
+    @classmethod
+    def milestone_title(cls, habit, streak_length):
+        """
+        Returns the title of the milestone reached by a streak, if any.
+
+        Milestones are looked up by the habit's period and the streak length
+        expressed in periods, so the check is a constant-time dictionary lookup.
+        Milestones declared in the ``HABIT_STREAK_MILESTONES`` setting take
+        precedence over the built-in ``MILESTONES``.
+
+        Parameters
+        ----------
+        habit : Habit
+            The habit associated with the streak.
+        streak_length : int
+            The length of the streak in tasks.
 
+        Returns
+        -------
+        str or None
+            The milestone title, or None if the streak is not on a milestone.
+        """
+        periods, remainder = divmod(streak_length, habit.frequency)
+        if remainder or not periods:
+            return None
+        extra = getattr(settings, 'HABIT_STREAK_MILESTONES', {})
+        return (extra.get(habit.period, {}).get(periods)
+                or cls.MILESTONES.get(habit.period, {}).get(periods))
 
     @classmethod
-    def rewards_streaks(cls, habit_id, streak):
+    def reward_milestones(cls, reached):
+        """
+        Create the achievements of every milestone reached in a batch.
+
+        Parameters
+        ----------
+        reached : iterable
+            ``(habit, streak_length)`` pairs to check against the milestones.
+
+        Returns
+        -------
+        list
+            The created Achievement objects, written with a single bulk insert.
+        """
+        now = timezone.now()
+        achievements = []
+        for habit, streak_length in reached:
+            title = cls.milestone_title(habit, streak_length)
+            if title:
+                achievements.append(cls(habit=habit, date=now, title=title,
+                                        streak_length=streak_length))
+        if achievements:
+            achievements = cls.objects.bulk_create(achievements)
+        return achievements
+
+    @classmethod
+    def rewards_streaks(cls, habit, streak):
         """
         Reward streaks when they reach predefined milestones.
 
@@ -327,50 +928,60 @@ class Achievement(models.Model):
 
         Parameters
         ----------
-        habit_id : int
-            The ID of the habit associated with the streak.
+        habit : Habit or int
+            The habit associated with the streak. Passing its ID costs an
+            extra query to fetch it.
         streak : Streak
             The streak object representing the current streak.
+
+        Returns
+        -------
+        list
+            The created Achievement objects.
+        """
+        if not isinstance(habit, Habit):
+            habit = Habit.objects.get(pk=habit)
+        return cls.reward_milestones([(habit, streak.current_streak)])
+
+
+class HabitRanking(models.Model):
+    """
+    Represents the precomputed rank of a habit for a period and weight profile.
+
+    The table is refreshed in the background by ``refresh_habit_rankings`` so
+    that pages read rankings with an indexed lookup instead of scoring habits.
+
+    Attributes
+    ----------
+    habit : Habit
+        The ranked habit.
+    user : User
+        The owner of the habit, denormalized for per-user lookups.
+    period : str
+        The period of the ranked habits.
+    profile : str
+        The name of the weight profile used to score the habits.
+    rank : int
+        The 1-based rank of the habit, in descending order of score.
+    score : float
+        The normalized score of the habit, or None when it is undefined.
+    refreshed_at : DateTime
+        The time the ranking was computed.
+    """
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='rankings')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    period = models.CharField(max_length=255)
+    profile = models.CharField(max_length=255)
+    rank = models.IntegerField()
+    score = models.FloatField(null=True, blank=True)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        """
+        Index matching the per-user ranking lookup of the analysis page.
         """
-        habit = Habit.objects.get(pk=habit_id)  # Retrieve the Habit instance using the habit_id
-
-        if streak.current_streak / habit.frequency == 7 and habit.period == 'daily':
-            title = '7-Day Streak'
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
-        if streak.current_streak / habit.frequency == 14 and habit.period == 'daily':
-            title = '14-Day Streak'
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
-        if streak.current_streak / habit.frequency == 30 and habit.period == 'daily':
-            title = '30-Day Streak'
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
-
-        # Weekly Achievements
-        if habit.period == 'weekly' and (streak.current_streak / habit.frequency) == 1 :
-            title = '1-Week Streak'
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
-        if (streak.current_streak / habit.frequency) == 2 and habit.period == 'weekly':
-            title = "2-Week's Streak"
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
-        if (streak.current_streak / habit.frequency) == 4 and habit.period == 'weekly':
-            title = "4-Week's Streak"
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
-
-        # Monthly Achievements
-        if streak.current_streak // habit.frequency == 1  and habit.period == 'monthly':
-            title = '1-Month Streak'
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
-        if streak.current_streak // habit.frequency == 2 and habit.period == 'monthly':
-            title = "2-Month's Streak"
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
-        if streak.current_streak // habit.frequency == 4 and habit.period == 'monthly':
-            title = "4-Month's Streak"
-            cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
\ No newline at end of file
+        indexes = [
+            models.Index(fields=['user', 'profile', 'period', 'rank'],
+                         name='ranking_user_lookup_idx'),
+            models.Index(fields=['profile', 'period'], name='ranking_profile_period_idx'),
+        ]
@@ -0,0 +1,220 @@
+"""
+Sampling request profiler for the Habit application.
+
+``ProfilingMiddleware`` runs ``cProfile`` on a random sample of requests and
+writes one ``.prof`` file per profiled request under
+``HABIT_PROFILE_DIR/<url name>/``. The profiles of an endpoint are aggregated
+by ``manage.py profile_report``, which splits the time across the ORM,
+template rendering, NumPy, signal handlers and the application's own code,
+and can export collapsed stacks for flamegraph tools.
+
+The sample rate is set by ``HABIT_PROFILE_SAMPLE_RATE``, between 0 and 1.
+At 0, the default, the middleware unloads itself and adds no overhead.
+
+At most one request per process is profiled at a time: only one profiler can
+be active at once on Python 3.12 and later, so a sampled request arriving while
+another one is profiled is served without profiling. cProfile only sees the
+thread it runs on, so the code that async views run on the event loop or on
+other threads is not covered.
+
+Classes:
+    ProfilingMiddleware: Profile a sample of requests with cProfile.
+
+Functions:
+    load_profiles: Aggregate the saved profiles of each endpoint.
+    category_breakdown: Split the time of a profile across code categories.
+    collapsed_stacks: Export a profile as collapsed stacks.
+"""
+
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+# Code categories, matched in order against the path of a function's file
+CATEGORIES = [
+    ('signals', ('django/dispatch/', 'habit/signals.py', 'Users/signals.py')),
+    ('orm', ('django/db/',)),
+    ('template', ('django/template/', 'django/templatetags/')),
+    ('numpy', ('numpy/',)),
+    ('app', ('habit/', 'Users/', 'Habit_Tracker/')),
+]
+
+
+def get_profile_dir():
+    """
+    Return the directory the profiles are written to.
+
+    Returns
+    -------
+    pathlib.Path
+        The ``HABIT_PROFILE_DIR`` setting, defaulting to ``BASE_DIR / 'profiles'``.
+    """
+    directory = getattr(settings, 'HABIT_PROFILE_DIR', None)
+    return Path(directory) if directory else Path(settings.BASE_DIR) / 'profiles'
+
+
+# Held while a request is profiled
+_profiling = threading.Lock()
+
+
+class ProfilingMiddleware:
+    """
+    Profile a random sample of requests with cProfile, one at a time.
+
+    Attributes
+    ----------
+    sample_rate : float
+        The fraction of requests profiled.
+    directory : pathlib.Path
+        The directory the profiles are written to.
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = float(getattr(settings, 'HABIT_PROFILE_SAMPLE_RATE', 0))
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = get_profile_dir()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate or not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            _profiling.release()
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.url_name if match else None) or 'unresolved'
+        directory = self.directory / url_name
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{uuid.uuid4().hex[:8]}.prof'
+        profiler.dump_stats(directory / name)
+        return response
+
+
+def load_profiles(directory=None):
+    """
+    Aggregate the saved profiles of each endpoint.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path, optional
+        The profile directory. Defaults to ``get_profile_dir()``.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping each URL name to a ``(number_of_profiles, pstats.Stats)`` pair.
+    """
+    directory = Path(directory) if directory else get_profile_dir()
+    profiles = {}
+    if not directory.is_dir():
+        return profiles
+    for endpoint in sorted(path for path in directory.iterdir() if path.is_dir()):
+        files = sorted(str(path) for path in endpoint.glob('*.prof'))
+        if files:
+            profiles[endpoint.name] = (len(files), pstats.Stats(*files))
+    return profiles
+
+
+def categorize(filename):
+    """
+    Return the code category of a source file.
+
+    Parameters
+    ----------
+    filename : str
+        The path of the file, as recorded by cProfile.
+
+    Returns
+    -------
+    str
+        One of the ``CATEGORIES`` names, or 'other'.
+    """
+    filename = filename.replace(os.sep, '/')
+    for category, patterns in CATEGORIES:
+        if any(pattern in filename for pattern in patterns):
+            return category
+    return 'other'
+
+
+def category_breakdown(stats):
+    """
+    Split the time of a profile across code categories.
+
+    Each function's own time (excluding its callees) is attributed to the
+    category of its file, so the categories add up to the total time.
+
+    Parameters
+    ----------
+    stats : pstats.Stats
+        The profile.
+
+    Returns
+    -------
+    dict
+        The seconds spent in each category, largest first.
+    """
+    seconds = defaultdict(float)
+    for (filename, _, _), (_, _, own_time, _, _) in stats.stats.items():
+        seconds[categorize(filename)] += own_time
+    return dict(sorted(seconds.items(), key=lambda item: item[1], reverse=True))
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def collapsed_stacks(stats):
+    """
+    Export a profile as collapsed stacks for flamegraph tools.
+
+    cProfile only keeps caller-callee pairs, so each function's own time is
+    attributed to a single stack built by following, from the function up,
+    the caller that spent the most time in it.
+
+    Parameters
+    ----------
+    stats : pstats.Stats
+        The profile.
+
+    Returns
+    -------
+    list
+        Lines of the form ``root;...;function microseconds``.
+    """
+    lines = []
+    for func, (_, _, own_time, _, callers) in stats.stats.items():
+        weight = int(own_time * 1e6)
+        if not weight:
+            continue
+        stack = [func]
+        seen = {func}
+        while callers:
+            caller = max(callers, key=lambda c: callers[c][3])
+            if caller in seen:
+                break
+            stack.append(caller)
+            seen.add(caller)
+            callers = stats.stats.get(caller, (0, 0, 0, 0, {}))[4]
+        lines.append(';'.join(_label(f) for f in reversed(stack)) + f' {weight}')
+    return sorted(lines)
@@ -0,0 +1,234 @@
+"""
+SQL query instrumentation and per-view query budgets for the Habit application.
+
+A ``QueryRecorder`` records the SQL statements run while it is active: their
+number, their total time and the statement shapes run more than once, which
+are the signature of N+1 queries.
+
+Budgets are declared per URL name of ``Habit_Tracker/urls.py`` in the
+``HABIT_QUERY_BUDGETS`` setting:
+
+    {'habit-home': {'queries': 20, 'time_ms': 100, 'duplicates': 2},
+     'active_habits': 10}
+
+where a plain number is a query-count budget. They are enforced by
+``assert_query_budget`` in tests and reported by ``QueryBudgetMiddleware``,
+which is only active when ``DEBUG`` and ``HABIT_QUERY_INSTRUMENTATION`` are set.
+
+Classes:
+    QueryRecorder: Record the SQL statements run on every database connection.
+    QueryBudgetMiddleware: Log the queries of each request and its budget overruns.
+
+Functions:
+    get_budget: Return the query budget of a URL name.
+    budget_violations: Compare a recording against a budget.
+    assert_query_budget: Fail when the wrapped block goes over a URL name's budget.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger('habit.queries')
+
+# Collapses the placeholder lists of IN clauses, whose length varies per call
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+def query_shape(sql):
+    """
+    Return the shape of an SQL statement, ignoring the length of its IN lists.
+
+    Parameters
+    ----------
+    sql : str
+        The SQL statement, with its parameters as placeholders.
+
+    Returns
+    -------
+    str
+        The normalized statement.
+    """
+    return _PLACEHOLDER_LIST.sub('%s, ...', sql)
+
+
+class QueryRecorder:
+    """
+    Record the SQL statements run on every database connection while active.
+
+    Use it as a context manager; it can be entered once.
+
+    Attributes
+    ----------
+    queries : list
+        The ``(sql, duration)`` pairs of the statements run, in seconds.
+    """
+
+    def __init__(self, using=None):
+        self.using = using
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def __enter__(self):
+        aliases = [self.using] if self.using else list(connections)
+        self._stack = ExitStack()
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def count(self):
+        """
+        The number of statements run.
+        """
+        return len(self.queries)
+
+    @property
+    def time_ms(self):
+        """
+        The total time spent in SQL, in milliseconds.
+        """
+        return sum(duration for _, duration in self.queries) * 1000
+
+    def duplicates(self):
+        """
+        Return the statement shapes run more than once.
+
+        Returns
+        -------
+        dict
+            The number of runs of each duplicated shape, most frequent first.
+        """
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return {shape: n for shape, n in shapes.most_common() if n > 1}
+
+
+def get_budget(url_name):
+    """
+    Return the query budget of a URL name.
+
+    Parameters
+    ----------
+    url_name : str
+        The name of the URL pattern.
+
+    Returns
+    -------
+    dict or None
+        The budget, with any of the 'queries', 'time_ms' and 'duplicates' keys,
+        or None if no budget is declared for the URL name.
+    """
+    budget = getattr(settings, 'HABIT_QUERY_BUDGETS', {}).get(url_name)
+    if isinstance(budget, int):
+        budget = {'queries': budget}
+    return budget
+
+
+def budget_violations(recorder, budget):
+    """
+    Compare a recording against a budget.
+
+    Parameters
+    ----------
+    recorder : QueryRecorder
+        The recording.
+    budget : dict
+        The budget, as returned by ``get_budget``.
+
+    Returns
+    -------
+    list
+        A message for each limit of the budget that was exceeded.
+    """
+    violations = []
+    if 'queries' in budget and recorder.count > budget['queries']:
+        violations.append(f'{recorder.count} queries (budget {budget["queries"]})')
+    if 'time_ms' in budget and recorder.time_ms > budget['time_ms']:
+        violations.append(f'{recorder.time_ms:.1f} ms of SQL (budget {budget["time_ms"]} ms)')
+    if 'duplicates' in budget:
+        duplicated = sum(n - 1 for n in recorder.duplicates().values())
+        if duplicated > budget['duplicates']:
+            violations.append(f'{duplicated} duplicated queries (budget {budget["duplicates"]})')
+    return violations
+
+
+@contextmanager
+def assert_query_budget(url_name, budget=None):
+    """
+    Fail when the wrapped block goes over the query budget of a URL name.
+
+    Parameters
+    ----------
+    url_name : str
+        The name of the URL pattern whose budget applies.
+    budget : dict, optional
+        The budget to enforce. Defaults to the one declared in ``HABIT_QUERY_BUDGETS``.
+
+    Yields
+    ------
+    QueryRecorder
+        The recorder of the block.
+
+    Raises
+    ------
+    AssertionError
+        If no budget is declared for ``url_name`` or if the block exceeds it.
+    """
+    budget = budget if budget is not None else get_budget(url_name)
+    if budget is None:
+        raise AssertionError(f"No query budget declared for '{url_name}'.")
+    with QueryRecorder() as recorder:
+        yield recorder
+    violations = budget_violations(recorder, budget)
+    if violations:
+        details = '\n'.join(f'{n}x {shape}' for shape, n in recorder.duplicates().items())
+        raise AssertionError(f"'{url_name}' is over its query budget: {', '.join(violations)}"
+                             + (f'\nDuplicated queries:\n{details}' if details else ''))
+
+
+class QueryBudgetMiddleware:
+    """
+    Log the SQL queries of each request and warn when a view goes over its budget.
+
+    The middleware is only active when both ``DEBUG`` and
+    ``HABIT_QUERY_INSTRUMENTATION`` are set, and costs nothing otherwise.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.DEBUG and getattr(settings, 'HABIT_QUERY_INSTRUMENTATION', False)):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        response['X-Habit-Queries'] = str(recorder.count)
+        response['X-Habit-Query-Time-Ms'] = f'{recorder.time_ms:.1f}'
+        logger.info('%s %s: %d queries, %.1f ms, %d duplicated shapes', request.method,
+                    url_name or request.path, recorder.count, recorder.time_ms,
+                    len(recorder.duplicates()))
+
+        budget = get_budget(url_name) if url_name else None
+        violations = budget_violations(recorder, budget) if budget else []
+        if violations:
+            logger.warning("'%s' is over its query budget: %s", url_name, ', '.join(violations))
+        return response
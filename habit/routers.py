@@ -0,0 +1,154 @@
+"""
+Database routing of the Habit application's analytics reads.
+
+The read-only analytics queries (habit rankings, completed habits, streak
+leaderboards and the habit data of the analysis page) can be served by a read
+replica, set by the ``HABIT_ANALYTICS_REPLICA`` database alias, while every
+other query keeps going to the primary database.
+
+A replica lags behind the primary, so a user who just completed a task is
+pinned to the primary for ``HABIT_REPLICA_PIN_SECONDS`` seconds and reads
+their own writes. Pins are kept in Django's default cache, which must be
+shared by every process for the pins to hold across them.
+
+Reads are sent to the replica either explicitly, with ``.using()`` and the
+alias returned by ``analytics_database``, or by running them inside
+``analytics_reads``, which ``AnalyticsReplicaRouter`` follows when it is
+listed in ``DATABASE_ROUTERS``.
+
+Classes:
+    AnalyticsReplicaRouter: Route the reads run inside analytics_reads.
+
+Functions:
+    analytics_database: Return the database alias of a user's analytics reads.
+    analytics_reads: Route the reads of the wrapped block to the analytics database.
+    pin_to_primary: Send a user's analytics reads to the primary for a while.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Database alias of the analytics reads of the running block, None outside of one
+_read_database = ContextVar('habit_analytics_database', default=None)
+
+
+def get_replica():
+    """
+    Return the alias of the analytics replica.
+
+    Returns
+    -------
+    str or None
+        The ``HABIT_ANALYTICS_REPLICA`` setting, or None if no replica is configured.
+    """
+    return getattr(settings, 'HABIT_ANALYTICS_REPLICA', None)
+
+
+def _pin_key(user_id):
+    return f'habit:primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """
+    Send a user's analytics reads to the primary for ``HABIT_REPLICA_PIN_SECONDS``.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user who wrote to the primary.
+    """
+    if get_replica():
+        cache.set(_pin_key(user_id), True, getattr(settings, 'HABIT_REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(user_id):
+    """
+    Return whether a user's analytics reads are pinned to the primary.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user.
+
+    Returns
+    -------
+    bool
+        True if the user wrote to the primary within the pinning window.
+    """
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def analytics_database(user_id=None):
+    """
+    Return the database alias of a user's analytics reads.
+
+    Parameters
+    ----------
+    user_id : int, optional
+        The ID of the user whose data is read. Defaults to none, for reads
+        spanning every user, which are never pinned.
+
+    Returns
+    -------
+    str or None
+        The replica alias, or None to read from the primary, either because
+        no replica is configured or because the user is pinned to the primary.
+    """
+    replica = get_replica()
+    if replica is None or (user_id is not None and is_pinned(user_id)):
+        return None
+    return replica
+
+
+@contextmanager
+def analytics_reads(user_id=None):
+    """
+    Route the reads of the wrapped block to the analytics database of a user.
+
+    Parameters
+    ----------
+    user_id : int, optional
+        The ID of the user whose data is read. Defaults to none, for reads
+        spanning every user.
+
+    Yields
+    ------
+    str or None
+        The alias the reads are routed to, as returned by ``analytics_database``.
+    """
+    token = _read_database.set(analytics_database(user_id))
+    try:
+        yield _read_database.get()
+    finally:
+        _read_database.reset(token)
+
+
+class AnalyticsReplicaRouter:
+    """
+    Route the reads run inside ``analytics_reads`` to the analytics replica.
+
+    Writes and reads outside of ``analytics_reads`` are left to the other
+    routers, or to the default database. The replica receives its schema
+    through replication, so migrations are never run on it.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        databases = {'default', get_replica()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == get_replica():
+            return False
+        return None
@@ -0,0 +1,144 @@
+"""
+In-process scheduler for the Habit application's background jobs.
+
+This module runs periodic jobs, such as the overdue-task sweep, on a daemon
+thread inside the web process so that page views no longer pay for them.
+
+The jobs are started by ``start_background_jobs``, which the WSGI and ASGI
+entry points (``Habit_Tracker/wsgi.py`` and ``asgi.py``) call once the
+application is loaded. Management commands, the test runner and the parent
+process of the runserver autoreloader never load them, so they run no jobs.
+
+Classes:
+    PeriodicJob: A daemon thread calling a function on a fixed interval.
+
+Functions:
+    start_sweeper: Start the overdue-task sweeper configured in settings.
+    start_ranking_refresher: Start the habit ranking refresher configured in settings.
+    start_background_jobs: Start every background job enabled in settings.
+"""
+
+import logging
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger('habit.scheduler')
+
+
+class PeriodicJob(threading.Thread):
+    """
+    A daemon thread calling a function every ``interval`` seconds.
+
+    Attributes
+    ----------
+    func : callable
+        The job to run.
+    interval : float
+        The number of seconds between two runs.
+    """
+
+    def __init__(self, func, interval, name=None):
+        super().__init__(name=name or func.__name__, daemon=True)
+        self.func = func
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        """
+        Run the job until ``stop`` is called.
+
+        Database connections are recycled around each run so a long-lived
+        thread never holds on to a stale connection. A failed run is logged
+        and the job runs again at the next interval.
+        """
+        while not self._stopped.wait(self.interval):
+            close_old_connections()
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Background job '%s' failed.", self.name)
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        """
+        Ask the thread to exit after its current run.
+        """
+        self._stopped.set()
+
+
+def start_sweeper():
+    """
+    Start the overdue-task sweeper on a daemon thread.
+
+    The sweep interval and the shard handled by this process are read from the
+    ``HABIT_SWEEP_INTERVAL``, ``HABIT_SWEEP_SHARD`` and ``HABIT_SWEEP_SHARDS`` settings.
+
+    Returns
+    -------
+    PeriodicJob
+        The started job.
+    """
+    from .analytics import sweep_overdue_tasks
+
+    shard = getattr(settings, 'HABIT_SWEEP_SHARD', 0)
+    num_shards = getattr(settings, 'HABIT_SWEEP_SHARDS', 1)
+
+    def sweep():
+        sweep_overdue_tasks(shard=shard, num_shards=num_shards)
+
+    job = PeriodicJob(sweep, getattr(settings, 'HABIT_SWEEP_INTERVAL', 300),
+                      name='overdue-task-sweeper')
+    job.start()
+    return job
+
+
+def start_ranking_refresher():
+    """
+    Start the habit ranking refresher on a daemon thread.
+
+    The refresh interval is read from the ``HABIT_RANKING_REFRESH_INTERVAL`` setting.
+    Each refresh rewrites the rankings of every user, so only one process of a
+    deployment should run it; ``manage.py refresh_rankings`` run from cron is
+    the usual way.
+
+    Returns
+    -------
+    PeriodicJob
+        The started job.
+    """
+    from .analytics import refresh_habit_rankings
+
+    job = PeriodicJob(refresh_habit_rankings, settings.HABIT_RANKING_REFRESH_INTERVAL,
+                      name='habit-ranking-refresher')
+    job.start()
+    return job
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def start_background_jobs():
+    """
+    Start every background job enabled in settings, once per process.
+
+    The overdue-task sweeper runs when ``HABIT_SWEEP_IN_PROCESS`` is set and
+    the ranking refresher when ``HABIT_RANKING_REFRESH_INTERVAL`` is set.
+
+    Returns
+    -------
+    list
+        The started jobs.
+    """
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = []
+            if getattr(settings, 'HABIT_SWEEP_IN_PROCESS', False):
+                _jobs.append(start_sweeper())
+            if getattr(settings, 'HABIT_RANKING_REFRESH_INTERVAL', None):
+                _jobs.append(start_ranking_refresher())
+        return _jobs
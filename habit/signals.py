@@ -1,5 +1,7 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from .cache import bump_user_versions
 from .models import Habit, Streak
 
 @receiver(post_save, sender=Habit)
@@ -58,3 +60,34 @@ def save_streak(sender, instance, **kwargs):
         streak_instance = instance.streak.first()
         if streak_instance:
             streak_instance.save()
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def invalidate_user_analytics(sender, instance, created=True, **kwargs):
+    """
+    Signal handler invalidating the owner's cached analytics.
+
+    This signal handler bumps the analytics version of the habit's owner when
+    a Habit instance is created or deleted, once the change is committed, so a
+    concurrent request cannot cache the analytics of the uncommitted change.
+
+    Parameters
+    ----------
+    sender : class
+        The class sending the signal (Habit).
+    instance : Habit
+        The Habit instance that was created or deleted.
+    created : bool
+        A boolean indicating whether the instance was created; always True on deletion.
+    **kwargs : dict
+        Additional keyword arguments.
+
+    Returns
+    -------
+    None
+
+    """
+    if created:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: bump_user_versions([user_id]))
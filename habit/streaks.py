@@ -0,0 +1,133 @@
+"""
+Vectorized streak recomputation for the Habit application.
+
+This module recomputes the Streak counters of habits from their task history
+instead of relying on incremental updates. The statuses of many habits are
+loaded into NumPy arrays and every metric is derived with a run-length
+encoding of the array, without a Python-level loop over tasks.
+
+Functions:
+    streak_metrics: Compute streak metrics from task history arrays.
+    rebuild_streaks: Recompute and save the Streak rows of habits in chunks.
+"""
+
+from functools import partial
+import numpy as np
+from django.db import transaction
+from habit.cache import bump_user_versions
+from habit.models import Habit, TaskTracker, Streak
+
+
+STREAK_FIELDS = ['num_of_completed_tasks', 'num_of_failed_tasks',
+                 'longest_streak', 'current_streak']
+
+
+def streak_metrics(habit_ids, completed):
+    """
+    Compute streak metrics for many habits at once.
+
+    Parameters
+    ----------
+    habit_ids : numpy.ndarray
+        The habit ID of each resolved task, grouped by habit.
+    completed : numpy.ndarray
+        A boolean array, True where the task was completed and False where it failed.
+        Within a habit, tasks must be ordered by task number.
+
+    Returns
+    -------
+    dict
+        A dictionary of arrays aligned on ``habit_id``, holding the sorted unique
+        habit IDs and their ``num_of_completed_tasks``, ``num_of_failed_tasks``,
+        ``longest_streak`` and ``current_streak``.
+    """
+    habit_ids = np.asarray(habit_ids)
+    completed = np.asarray(completed, dtype=bool)
+    habits, task_habit = np.unique(habit_ids, return_inverse=True)
+    metrics = {'habit_id': habits}
+    if not len(habit_ids):
+        for field in STREAK_FIELDS:
+            metrics[field] = np.zeros(0, dtype=np.int64)
+        return metrics
+
+    num_of_tasks = np.bincount(task_habit, minlength=len(habits))
+    num_of_completed = np.bincount(task_habit, weights=completed, minlength=len(habits)).astype(np.int64)
+
+    # Run-length encode the statuses; a run also ends where the habit changes
+    new_run = np.ones(len(habit_ids), dtype=bool)
+    new_run[1:] = (task_habit[1:] != task_habit[:-1]) | (completed[1:] != completed[:-1])
+    run_starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(run_starts, len(habit_ids)))
+    run_habit = task_habit[run_starts]
+    run_completed = completed[run_starts]
+
+    longest = np.zeros(len(habits), dtype=np.int64)
+    np.maximum.at(longest, run_habit[run_completed], run_lengths[run_completed])
+
+    # The current streak is the last run of each habit when it is a completed run
+    last_run = np.flatnonzero(np.append(run_habit[1:] != run_habit[:-1], True))
+    current = np.zeros(len(habits), dtype=np.int64)
+    current[run_habit[last_run]] = np.where(run_completed[last_run], run_lengths[last_run], 0)
+
+    metrics['num_of_completed_tasks'] = num_of_completed
+    metrics['num_of_failed_tasks'] = num_of_tasks - num_of_completed
+    metrics['longest_streak'] = longest
+    metrics['current_streak'] = current
+    return metrics
+
+
+def rebuild_streaks(habit_ids=None, chunk_size=500):
+    """
+    Recompute the Streak rows of habits from their task history.
+
+    Each chunk is rebuilt in a transaction holding the locks of its Streak
+    rows, so task completions recorded meanwhile are not overwritten. The
+    cached analytics of the owners of each chunk are invalidated once the
+    chunk is committed.
+
+    Parameters
+    ----------
+    habit_ids : list, optional
+        The IDs of the habits to rebuild. Defaults to every habit.
+    chunk_size : int, optional
+        The number of habits loaded and saved together. Defaults to 500.
+
+    Returns
+    -------
+    int
+        The number of Streak rows rebuilt.
+    """
+    habits = Habit.objects.order_by('id')
+    if habit_ids is not None:
+        habits = habits.filter(id__in=habit_ids)
+    owners = dict(habits.values_list('id', 'user_id'))
+    all_ids = list(owners)
+
+    rebuilt = 0
+    for i in range(0, len(all_ids), chunk_size):
+        chunk = all_ids[i:i + chunk_size]
+        with transaction.atomic():
+            # Lock the streaks before reading the tasks, so a task completed
+            # meanwhile is either counted here or applied after the rebuild
+            streaks = list(Streak.objects.select_for_update().filter(habit_id__in=chunk))
+            tasks = TaskTracker.objects.filter(
+                habit_id__in=chunk, task_status__in=['Completed', 'Failed']
+                ).order_by('habit_id', 'task_number').values_list('habit_id', 'task_status')
+            rows = list(tasks)
+            task_habits = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            completed = np.fromiter((row[1] == 'Completed' for row in rows), dtype=bool,
+                                    count=len(rows))
+
+            metrics = streak_metrics(task_habits, completed)
+            position = {habit_id: j for j, habit_id in enumerate(metrics['habit_id'].tolist())}
+
+            for streak in streaks:
+                j = position.get(streak.habit_id)
+                for field in STREAK_FIELDS:
+                    setattr(streak, field, int(metrics[field][j]) if j is not None else 0)
+
+            Streak.objects.bulk_update(streaks, STREAK_FIELDS, batch_size=chunk_size)
+            user_ids = {owners[habit_id] for habit_id in chunk}
+            transaction.on_commit(partial(bump_user_versions, user_ids))
+        rebuilt += len(streaks)
+    return rebuilt
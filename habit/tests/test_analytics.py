@@ -1,9 +1,13 @@
+import io
 from datetime import datetime
+from django.core.management import call_command
 from django.test import TestCase
 from django.utils import timezone
 from django.contrib.auth.models import User
-from habit.models import Habit, Streak
-from habit.analytics import rank_habits
+from freezegun import freeze_time
+from habit.models import Habit, HabitRanking, Streak
+from habit.analytics import (
+    rank_habits, refresh_habit_rankings, ranked_habits, active_habits_by_period)
 
 
 class AnalyticTestCase(TestCase):
@@ -119,4 +123,62 @@ class AnalyticTestCase(TestCase):
 
         assert ranked_habits[0][1] == 1.2634656762057948
         assert ranked_habits[1][1] == -0.08151391459392247
-        assert ranked_habits[2][1] == -1.1819517616118722
\ No newline at end of file
+        assert ranked_habits[2][1] == -1.1819517616118722
+
+    def test_rank_habits_top_k(self):
+        # Define weights and period
+        period = 'daily'
+        weights = {'completed_tasks': -0.2, 'failed_tasks': 0.8, 'longest_streak': -0.2, 'current_streak': -0.1}
+        ranked_habits = rank_habits(weights=weights, period=period)
+        top_habits = rank_habits(weights=weights, period=period, top_k=2)
+
+        assert top_habits == ranked_habits[:2]
+
+    def test_precomputed_rankings(self):
+        weights = {'completed_tasks': -0.2, 'failed_tasks': 0.8, 'longest_streak': -0.2, 'current_streak': -0.1}
+        refresh_habit_rankings()
+
+        # One indexed lookup plus the prefetch of the ranked habits' streaks
+        with self.assertNumQueries(2):
+            daily_rankings = ranked_habits(self.user_1.id, 'daily')
+
+        assert daily_rankings == rank_habits(weights=weights, period='daily')
+        assert ranked_habits(self.user_2.id, 'daily') == []
+
+    def test_empty_rankings_are_computed_by_the_command(self):
+        weights = {'completed_tasks': -0.2, 'failed_tasks': 0.8, 'longest_streak': -0.2, 'current_streak': -0.1}
+        # Reads never compute rankings
+        assert ranked_habits(self.user_1.id, 'daily') == []
+        assert not HabitRanking.objects.exists()
+
+        refresh_habit_rankings(['daily'], ['struggled_most'])
+        daily = list(HabitRanking.objects.filter(period='daily').values_list('pk', flat=True))
+        call_command('refresh_rankings', if_empty=True, stdout=io.StringIO())
+        # Only the empty rankings are computed
+        assert list(HabitRanking.objects.filter(period='daily', profile='struggled_most')
+                    .values_list('pk', flat=True)) == daily
+        assert HabitRanking.objects.filter(period='weekly').exists()
+        assert ranked_habits(self.user_1.id, 'daily') == rank_habits(weights=weights, period='daily')
+
+        stdout = io.StringIO()
+        call_command('refresh_rankings', if_empty=True, stdout=stdout)
+        assert stdout.getvalue() == '0 ranking row(s) written.\n'
+
+    def test_active_habits_by_period(self):
+        Streak.objects.filter(habit_id=143).update(num_of_completed_tasks=3, longest_streak=2)
+        with freeze_time(timezone.make_aware(datetime(2024, 4, 10))):
+            # The habits, their streaks and their progress are fetched in one query
+            with self.assertNumQueries(1):
+                habits = active_habits_by_period(self.user_1.id)
+
+        assert [habit.id for habit in habits['daily']] == [55, 58, 76]
+        assert [habit.id for habit in habits['weekly']] == [56, 57, 59]
+        assert [habit.id for habit in habits['monthly']] == [143]
+        assert len(habits['all']) == 7
+        # The partitions share the habit instances and their computed progress
+        assert habits['daily'][0] is habits['all'][0]
+        monthly_review = habits['monthly'][0]
+        assert monthly_review.progress_percentage == 50.0
+        assert monthly_review.longest_streak == 2
+        assert monthly_review.in_progress == 0
+        assert active_habits_by_period(self.user_2.id)['all'] == []
@@ -0,0 +1,80 @@
+import threading
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import AsyncRequestFactory, TransactionTestCase
+from django.utils import timezone
+from habit.analytics import aanalysis_summary, agather_reads, analysis_summary
+from habit.async_views import AsyncHabitAnalysis, AsyncHabitView
+from habit.cache import get_backend
+from habit.models import Habit, Streak, TaskTracker
+
+
+class AsyncViewTestCase(TransactionTestCase):
+    """Test cases for the async views."""
+
+    # The reads run on worker threads with connections of their own, which
+    # only see committed data
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='test_user_1', password='123456',
+                                             first_name='test', last_name='user')
+        self.habit = Habit.objects.create(user=self.user, name='Morning Run', frequency=1,
+                                          period='daily', goal=7, notes='', start_date=timezone.now())
+        TaskTracker.create_tasks(self.habit)
+        get_backend().clear()
+        self.factory = AsyncRequestFactory()
+
+    def post(self, path, data):
+        return self.factory.post(path, urlencode(data),
+                                 content_type='application/x-www-form-urlencoded')
+
+    async def test_home_page(self):
+        request = self.factory.get('/')
+        request.user = self.user
+        response = await AsyncHabitView.as_view()(request)
+        assert response.status_code == 200
+        assert b'morning run' in response.content
+
+    async def test_anonymous_user_is_redirected(self):
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        response = await AsyncHabitView.as_view()(request)
+        assert response.status_code == 302
+
+    async def test_complete_task(self):
+        task = await TaskTracker.objects.filter(habit=self.habit).order_by('task_number').afirst()
+        request = self.post('/', {'task_id': task.id, 'habit_id': self.habit.id})
+        request.user = self.user
+        response = await AsyncHabitView.as_view()(request)
+        assert response.status_code == 302
+        streak = await Streak.objects.aget(habit=self.habit)
+        assert streak.current_streak == 1
+
+    async def test_reads_overlap(self):
+        # Each read waits for the other: run one after another, they time out
+        barrier = threading.Barrier(2, timeout=5)
+
+        def read():
+            barrier.wait()
+            return threading.get_ident()
+
+        threads = await agather_reads(read, read)
+        assert threads[0] != threads[1]
+
+    async def test_analysis_matches_sync_summary(self):
+        assert await aanalysis_summary(self.user.id) == \
+            await sync_to_async(analysis_summary)(self.user.id)
+
+        request = self.factory.get('/Habits-Analysis/')
+        request.user = self.user
+        response = await AsyncHabitAnalysis.as_view()(request)
+        assert response.status_code == 200
+
+    async def test_analysis_habit_lookup(self):
+        request = self.post('/Habits-Analysis/', {'selectedValue': self.habit.id})
+        request.user = self.user
+        response = await AsyncHabitAnalysis.as_view()(request)
+        assert response.status_code == 200
+        assert b'"current_streak": 0' in response.content
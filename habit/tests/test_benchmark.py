@@ -0,0 +1,29 @@
+from django.test import TestCase
+from habit.models import Habit, Streak, TaskTracker
+from habit.benchmark import ENDPOINTS, compare_results, generate_dataset, run_benchmark, summarize
+
+
+class BenchmarkTestCase(TestCase):
+    """Test cases for the benchmark harness."""
+
+    def test_generate_and_run(self):
+        users = generate_dataset(2, 2, history_days=20, seed=1)
+        assert Habit.objects.filter(user__in=users).count() == 4
+        assert Streak.objects.filter(habit__user__in=users).count() == 4
+        # The history is resolved and reflected in the streaks
+        resolved = TaskTracker.objects.filter(user__in=users, task_status__in=['Completed', 'Failed'])
+        completed = sum(Streak.objects.filter(habit__user__in=users).values_list(
+            'num_of_completed_tasks', flat=True))
+        assert completed == resolved.filter(task_status='Completed').count()
+
+        results = run_benchmark(users, repeat=2)
+        assert set(results) == set(ENDPOINTS)
+        assert results['analysis']['samples'] == 2
+        assert results['analysis']['p50_ms'] <= results['analysis']['max_ms']
+
+    def test_compare_results(self):
+        baseline = {'habit_home': summarize([0.010, 0.012]), 'analysis': summarize([0.020])}
+        results = {'habit_home': summarize([0.010, 0.012]), 'analysis': summarize([0.030])}
+        regressions = compare_results(results, baseline, threshold=0.1)
+        assert [(name, metric) for name, metric, _, _ in regressions] == [
+            ('analysis', 'p50_ms'), ('analysis', 'p95_ms')]
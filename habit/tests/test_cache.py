@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from habit.analytics import refresh_habit_rankings
+from habit.cache import LRUCache, cached_for_user, get_backend
+from habit.models import Habit, TaskTracker
+from habit.streaks import rebuild_streaks
+
+
+class AnalyticsCacheTestCase(TestCase):
+    """Test cases for the per-user analytics cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user_1 = User.objects.create_user(username='test_user_1', password='123456')
+        cls.habit = Habit.objects.create(name='Exercise', frequency=1, period='daily', goal=7,
+                                         num_of_tasks=0, notes='', start_date=timezone.now(),
+                                         user=cls.user_1)
+        TaskTracker.create_tasks(cls.habit)
+
+    def setUp(self):
+        """Start each test with an empty cache."""
+        get_backend().clear()
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return self.computed
+
+    def test_lru_eviction(self):
+        lru = LRUCache(max_entries=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        assert lru.get('a') == 1
+        assert lru.get('b') is None
+        assert lru.get('c') == 3
+
+    def test_invalidated_by_task_completion(self):
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+
+        task = TaskTracker.objects.filter(habit=self.habit).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskTracker.complete_task(task.id, self.habit.id, self.user_1.id)
+            # Reads before the commit still see the old version
+            assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 2
+
+    def test_invalidated_by_habit_deletion(self):
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+        with self.captureOnCommitCallbacks(execute=True):
+            self.habit.delete()
+            assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 2
+
+    def test_invalidated_by_streak_rebuild(self):
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_streaks([self.habit.id])
+            assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 2
+
+    def test_invalidated_by_ranking_refresh(self):
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_habit_rankings(['daily'])
+            assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+        assert cached_for_user(self.user_1.id, 'test', self.compute) == 2
+
+    def test_django_cache_backend(self):
+        with self.settings(HABIT_ANALYTICS_CACHE={'BACKEND': 'django', 'ALIAS': 'default'}):
+            get_backend().clear()
+            assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
+            assert cached_for_user(self.user_1.id, 'test', self.compute) == 1
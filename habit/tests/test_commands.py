@@ -0,0 +1,56 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from freezegun import freeze_time
+from habit.analytics import users_with_overdue_tasks
+from habit.models import Habit, TaskTracker, Streak
+
+
+class SweepOverdueTasksCommandTestCase(TestCase):
+    """Test cases for the sweep_overdue_tasks management command."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user_1 = User.objects.create_user(username='test_user_1', password='123456')
+        cls.habit = Habit.objects.create(name='Exercise', frequency=1, period='daily', goal=7,
+                                         num_of_tasks=0, notes='', start_date=timezone.now(),
+                                         user=cls.user_1)
+        TaskTracker.create_tasks(cls.habit)
+        Streak.objects.filter(habit=cls.habit).update(current_streak=3)
+
+    def test_sweep_is_idempotent(self):
+        """Test that sweeping twice fails each overdue task only once."""
+        with freeze_time(timezone.now() + timedelta(days=2)):
+            call_command('sweep_overdue_tasks', stdout=StringIO())
+            call_command('sweep_overdue_tasks', stdout=StringIO())
+
+        streak = Streak.objects.get(habit=self.habit)
+        assert TaskTracker.objects.filter(habit=self.habit, task_status='Failed').count() == 2
+        assert streak.num_of_failed_tasks == 2
+        assert streak.current_streak == 0
+        assert self.habit.achievement.get().title == 'Break The Habit'
+
+    def test_sweep_only_handles_its_shard(self):
+        """Test that a shard leaves other shards' users untouched."""
+        other_shard = (self.user_1.id + 1) % 2
+        with freeze_time(timezone.now() + timedelta(days=2)):
+            call_command('sweep_overdue_tasks', shards=2, shard=other_shard, stdout=StringIO())
+
+        assert not TaskTracker.objects.filter(habit=self.habit, task_status='Failed').exists()
+
+    def test_overdue_users_are_sharded_in_sql(self):
+        """Test that each shard only reads the users of its shard."""
+        user_2 = User.objects.create_user(username='test_user_2', password='123456')
+        habit = Habit.objects.create(name='Read', frequency=1, period='daily', goal=7,
+                                     num_of_tasks=0, notes='', start_date=timezone.now(),
+                                     user=user_2)
+        TaskTracker.create_tasks(habit)
+        with freeze_time(timezone.now() + timedelta(days=2)):
+            shards = [users_with_overdue_tasks(shard, 2) for shard in range(2)]
+            assert users_with_overdue_tasks() == [self.user_1.id, user_2.id]
+        assert shards[self.user_1.id % 2] == [self.user_1.id]
+        assert shards[user_2.id % 2] == [user_2.id]
@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from habit.export import export_journal
+from habit.models import Achievement, Habit, TaskTracker
+from habit.queries import QueryRecorder
+
+
+class JournalExportTestCase(TestCase):
+    """Test cases for the journal exports."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = User.objects.create_user(username='test_user_1', password='123456',
+                                            first_name='test', last_name='user')
+        cls.other = User.objects.create_user(username='test_user_2', password='123456')
+        cls.habits = []
+        for name, user in [('Read', cls.user), ('Run', cls.user), ('Swim', cls.other)]:
+            habit = Habit.objects.create(name=name, frequency=1, period='daily', goal=7,
+                                         notes='', start_date=timezone.now(), user=user)
+            TaskTracker.create_tasks(habit)
+            cls.habits.append(habit)
+        Achievement.objects.create(habit=cls.habits[0], streak_length=7, title='7-Day Streak',
+                                   date=timezone.now())
+
+    def read(self, chunks):
+        return ''.join(chunks)
+
+    def test_csv_tasks(self):
+        rows = list(csv.DictReader(io.StringIO(self.read(
+            export_journal(self.user.id, 'tasks', 'csv')))))
+        assert len(rows) == 14
+        assert {row['habit_id'] for row in rows} == {str(self.habits[0].id),
+                                                       str(self.habits[1].id)}
+        assert rows[0]['task_number'] == '1'
+        assert rows[0]['task_completion_date'] == ''
+        assert list(rows[0]) == ['id', 'habit_id', 'task_number', 'task_status', 'start_date',
+                                 'due_date', 'task_completion_date']
+
+    def test_ndjson_journal(self):
+        records = [json.loads(line) for line in
+                   self.read(export_journal(self.user.id)).splitlines()]
+        tables = [record['table'] for record in records]
+        assert tables == ['habits'] * 2 + ['tasks'] * 14 + ['streaks'] * 2 + ['achievements']
+        assert records[0]['name'] == 'read'
+        assert records[-1]['title'] == '7-Day Streak'
+
+    def test_pages_bound_queries_and_chunks(self):
+        with QueryRecorder() as recorder:
+            chunks = list(export_journal(self.user.id, 'tasks', 'ndjson', chunk_size=3))
+        # Pages of 3, 3, 3, 3 and 2 tasks, whichever habit they belong to
+        assert recorder.count == 5
+        assert len(chunks) == 5
+        assert sum(chunk.count('\n') for chunk in chunks) == 14
+
+    def test_journal_is_not_exported_as_csv(self):
+        with self.assertRaises(ValueError):
+            export_journal(self.user.id, 'journal', 'csv')
+        with self.assertRaises(ValueError):
+            export_journal(self.user.id, 'users', 'ndjson')
+
+    def test_view_streams_user_export(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('journal_export', kwargs={
+            'table': 'habits', 'export_format': 'csv'}))
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv'
+        assert response['Content-Disposition'] == 'attachment; filename="habits.csv"'
+        content = b''.join(response.streaming_content).decode()
+        assert 'read' in content and 'swim' not in content
+
+        response = self.client.get(reverse('journal_export', kwargs={
+            'table': 'journal', 'export_format': 'csv'}))
+        assert response.status_code == 404
+
+    def test_view_requires_login(self):
+        response = self.client.get(reverse('journal_export', kwargs={
+            'table': 'journal', 'export_format': 'ndjson'}))
+        assert response.status_code == 302
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'streaks.csv')
+            call_command('export_journal', 'test_user_1', table='streaks', format='csv',
+                         output=path)
+            with open(path, newline='') as f:
+                rows = list(csv.DictReader(f))
+        assert [int(row['habit_id']) for row in rows] == [self.habits[0].id, self.habits[1].id]
+
+        stdout = io.StringIO()
+        call_command('export_journal', 'test_user_2', stdout=stdout)
+        assert len(stdout.getvalue().splitlines()) == 1 + 7 + 1
+        with self.assertRaises(CommandError):
+            call_command('export_journal', 'nobody', stdout=io.StringIO())
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from habit.models import Habit, Streak
+from habit.analytics import longest_streak_over_all_habits
+from habit.leaderboard import top_habit_ids
+
+
+class LeaderboardTestCase(TestCase):
+    """Test cases for the streak leaderboards."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user_1 = User.objects.create_user(username='test_user_1', password='123456')
+        cls.user_2 = User.objects.create_user(username='test_user_2', password='123456')
+        cls.habits = []
+        for i, (user, longest) in enumerate([(cls.user_1, 5), (cls.user_1, 9),
+                                             (cls.user_2, 12), (cls.user_2, 3)]):
+            habit = Habit.objects.create(name=f'Habit {i}', frequency=1, period='daily', goal=7,
+                                         notes='', start_date=timezone.now(), user=user)
+            Streak.objects.filter(habit=habit).update(longest_streak=longest, current_streak=i)
+            cls.habits.append(habit)
+
+    def ids(self, *indexes):
+        return [self.habits[i].id for i in indexes]
+
+    def test_top_habit_ids(self):
+        assert top_habit_ids('longest_streak', 2) == self.ids(2, 1)
+        assert top_habit_ids('longest_streak', 3, user_id=self.user_1.id) == self.ids(1, 0)
+        assert top_habit_ids('current_streak', 1, user_id=self.user_2.id) == self.ids(3)
+        with self.assertRaises(ValueError):
+            top_habit_ids('num_of_tasks')
+
+    def test_longest_streak_is_scoped_to_user(self):
+        habits = longest_streak_over_all_habits(self.user_1.id)
+        assert habits == [self.habits[1]]
+        assert habits[0].longest_streak == 9
+        assert longest_streak_over_all_habits() == [self.habits[2]]
@@ -1,9 +1,10 @@
 from datetime import timedelta
+from unittest import mock
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.test import TestCase
 from freezegun import freeze_time
-from habit.models import Habit, TaskTracker, Streak, Achievement
+from habit.models import Habit, HabitRanking, TaskTracker, Streak, Achievement
 from habit.analytics import extract_first_failed_task
 
 
@@ -106,6 +107,111 @@ class TaskTrackerTestCase(TestCase):
         for index, task in enumerate(tasks, start=1):
             assert task.task_number == index
 
+    def test_task_creation_is_batched(self):
+        """Test that tasks are written with chunked bulk inserts."""
+        habit = Habit.objects.create(name='Reading', frequency=2, period='daily', goal=365,
+                                     num_of_tasks=0, notes='', start_date=timezone.now(),
+                                     user=self.user_1)
+
+        # One INSERT per batch of 100 plus the savepoint pair of the transaction
+        with self.assertNumQueries(10):
+            TaskTracker.create_tasks(habit, batch_size=100)
+
+        assert TaskTracker.objects.filter(habit=habit).count() == 730
+
+    def test_task_owner_follows_habit(self):
+        """Test that the denormalized task owner stays in sync with the habit."""
+        TaskTracker.create_tasks(self.habit)
+        single_task = TaskTracker.objects.create(habit=self.habit, task_number=99)
+        assert single_task.user_id == self.user_1.id
+
+        user_2 = User.objects.create_user(username='test_user_2', password='123456')
+        habit = Habit.objects.get(pk=self.habit.pk)
+        habit.user = user_2
+        habit.save()
+
+        tasks = TaskTracker.objects.filter(habit=self.habit)
+        assert set(tasks.values_list('user_id', flat=True)) == {user_2.id}
+
+    def test_owner_follows_habit_updates(self):
+        """Test that queryset updates of the owner reach the tasks and rankings."""
+        TaskTracker.create_tasks(self.habit)
+        user_2 = User.objects.create_user(username='test_user_2', password='123456')
+        HabitRanking.objects.create(habit=self.habit, user=self.user_1, period='daily',
+                                    profile='struggled_most', rank=1, score=1.0,
+                                    refreshed_at=timezone.now())
+
+        Habit.objects.filter(pk=self.habit.pk).update(user=user_2)
+        assert set(TaskTracker.objects.filter(habit=self.habit).values_list('user_id', flat=True)) \
+            == {user_2.id}
+        assert HabitRanking.objects.get(habit=self.habit).user_id == user_2.id
+
+        habit = Habit.objects.get(pk=self.habit.pk)
+        habit.user = self.user_1
+        habit.save()
+        assert HabitRanking.objects.get(habit=self.habit).user_id == self.user_1.id
+
+        # Updates of other fields leave the tasks alone
+        with self.assertNumQueries(1):
+            Habit.objects.filter(pk=self.habit.pk).update(notes='Every morning')
+
+    def test_rolling_task_window(self):
+        """Test that only the tasks of the next periods are materialized."""
+        habit = Habit.objects.create(name='Drink water', frequency=3, period='daily', goal=365,
+                                     num_of_tasks=0, notes='', start_date=timezone.now(),
+                                     user=self.user_1)
+        TaskTracker.create_tasks(habit, window=2)
+        tasks = TaskTracker.objects.filter(habit=habit)
+        assert tasks.count() == 7
+
+        with freeze_time(timezone.now() + timedelta(days=3)):
+            TaskTracker.extend_task_window(Habit.objects.filter(pk=habit.pk), window=2)
+        assert tasks.count() == 16
+
+        # Materialized tasks match the schedule written without a window
+        schedule = list(TaskTracker.generate_tasks(habit))
+        for task in tasks.order_by('task_number'):
+            expected = schedule[task.task_number - 1]
+            assert (task.start_date, task.due_date) == (expected.start_date, expected.due_date)
+
+    def test_task_window_completes_ended_habits(self):
+        """Test that a habit ending before its window caught up gets all its tasks."""
+        habit = Habit.objects.create(name='Stretch', frequency=1, period='daily', goal=10,
+                                     num_of_tasks=0, notes='', start_date=timezone.now(),
+                                     user=self.user_1)
+        TaskTracker.create_tasks(habit, window=2)
+        tasks = TaskTracker.objects.filter(habit=habit)
+        assert tasks.count() == 3
+
+        with freeze_time(timezone.now() + timedelta(days=20)):
+            TaskTracker.extend_task_window(Habit.objects.filter(pk=habit.pk), window=2)
+            assert tasks.count() == 10
+            TaskTracker.fail_overdue_tasks([self.user_1.id])
+        assert tasks.filter(task_status='Failed').count() == 10
+
+        # Fully materialized habits are skipped
+        assert TaskTracker.extend_task_window(Habit.objects.filter(pk=habit.pk), window=2) == []
+
+    def test_concurrent_task_window_extensions(self):
+        """Test that tasks written by a concurrent extension are not written twice."""
+        habit = Habit.objects.create(name='Stretch', frequency=1, period='daily', goal=10,
+                                     num_of_tasks=0, notes='', start_date=timezone.now(),
+                                     user=self.user_1)
+        TaskTracker.create_tasks(habit, window=2)
+        generate_tasks = TaskTracker.generate_tasks
+
+        def racing(habit, **kwargs):
+            # Another caller writes the same tasks between the read and the insert
+            TaskTracker.objects.bulk_create(generate_tasks(habit, **kwargs))
+            return generate_tasks(habit, **kwargs)
+
+        with freeze_time(timezone.now() + timedelta(days=3)), \
+                mock.patch.object(TaskTracker, 'generate_tasks', side_effect=racing):
+            TaskTracker.extend_task_window(Habit.objects.filter(pk=habit.pk), window=2)
+        numbers = list(TaskTracker.objects.filter(habit=habit).order_by('task_number')
+                       .values_list('task_number', flat=True))
+        assert numbers == list(range(1, 7))
+
     def test_task_due_dates(self):
         """Test due dates calculation for TaskTracker objects."""
         TaskTracker.create_tasks(self.habit)
@@ -155,6 +261,33 @@ class TaskTrackerTestCase(TestCase):
                     assert task.habit_id in updated_habit_ids
                     assert task.id in updated_task_ids
 
+    def test_fail_overdue_tasks_batched_fallback(self):
+        """Test the bounded fallback used on backends without UPDATE ... RETURNING."""
+        TaskTracker.create_tasks(self.habit)
+
+        frozen_time = timezone.now() + timedelta(days=2)
+        with freeze_time(frozen_time):
+            rows = TaskTracker._fail_overdue_batched([self.user_1.id], timezone.now(), batch_size=1)
+            # A second sweep finds nothing left to fail
+            assert TaskTracker.update_failed_tasks(self.user_1.id) == ([], [])
+
+        failed = TaskTracker.objects.filter(habit=self.habit, task_status='Failed')
+        assert sorted(rows) == sorted(failed.values_list('id', 'habit_id', 'user_id'))
+        assert failed.count() == 2
+
+    def test_update_failed_tasks_query_count(self):
+        """Test that the overdue sweep does not issue one UPDATE per task."""
+        habit = Habit.objects.create(name='Reading', frequency=2, period='daily', goal=30,
+                                     num_of_tasks=0, notes='', start_date=timezone.now(),
+                                     user=self.user_1)
+        TaskTracker.create_tasks(habit)
+
+        with freeze_time(timezone.now() + timedelta(days=30)):
+            with self.assertNumQueries(3):
+                _, updated_task_ids = TaskTracker.update_failed_tasks(self.user_1.id)
+
+        assert len(updated_task_ids) == 60
+
 
 class StreakTestCase(TestCase):
     """Test cases for the Streak model."""
@@ -222,6 +355,21 @@ class StreakTestCase(TestCase):
         assert streak.num_of_failed_tasks == 2
         assert streak.longest_streak == 7
         assert streak.current_streak == 3
+    def test_update_streak_grouped(self):
+        """Test that failures are applied per habit with a single UPDATE."""
+        habit_2 = Habit.objects.create(name='Reading', frequency=1, period='daily',
+                                       goal=12, num_of_tasks=0, notes='',
+                                       start_date=timezone.now(), user=self.user_1)
+        Streak.objects.filter(habit__in=[self.habit, habit_2]).update(current_streak=4)
+
+        with self.assertNumQueries(1):
+            Streak.update_streak([self.habit.id] * 3 + [habit_2.id])
+
+        streak_1 = Streak.objects.get(habit=self.habit)
+        streak_2 = Streak.objects.get(habit=habit_2)
+        assert (streak_1.num_of_failed_tasks, streak_1.current_streak) == (3, 0)
+        assert (streak_2.num_of_failed_tasks, streak_2.current_streak) == (1, 0)
+
 
 class AchievementTestCase(TestCase):
     """Test cases for the Achievement model."""
@@ -322,3 +470,34 @@ class AchievementTestCase(TestCase):
         assert achievements[1].title == "2-Week's Streak"
         assert achievements[2].title == "4-Week's Streak"
         assert achievements[2].streak_length == 8
+
+    def test_custom_milestones(self):
+        """Test that milestones declared in settings are rewarded without extra lookups."""
+        streak = Streak.objects.get(habit=self.habit_1)
+        streak.current_streak = 60
+        with self.settings(HABIT_STREAK_MILESTONES={'daily': {60: '60-Day Streak'}}):
+            # One INSERT, no query to re-fetch the habit
+            with self.assertNumQueries(1):
+                achievements = Achievement.rewards_streaks(self.habit_1, streak)
+
+        assert [a.title for a in achievements] == ['60-Day Streak']
+        assert Achievement.milestone_title(self.habit_2, 3) is None
+        assert Achievement.milestone_title(self.habit_2, 4) == "2-Week's Streak"
+
+    def test_update_achievements_batched(self):
+        """Test that broken streaks of several habits are handled with a fixed number of queries."""
+        TaskTracker.create_tasks(self.habit_1)
+        TaskTracker.create_tasks(self.habit_2)
+        Streak.objects.filter(habit__in=[self.habit_1, self.habit_2]).update(current_streak=2)
+        TaskTracker.objects.filter(habit=self.habit_1, task_number__lte=2).update(task_status='Completed')
+        TaskTracker.objects.filter(habit=self.habit_2, task_number=1).update(task_status='Failed')
+        TaskTracker.objects.filter(habit=self.habit_2, task_number=2).update(task_status='Completed')
+
+        first_failed_tasks = TaskTracker.objects.filter(
+            task_number=3, habit__in=[self.habit_1, self.habit_2])
+        # Tasks, previous tasks, streaks and one bulk insert
+        with self.assertNumQueries(4):
+            Achievement.update_achievements(first_failed_tasks)
+
+        assert Achievement.objects.filter(habit=self.habit_1, title='Break The Habit').count() == 1
+        assert Achievement.objects.filter(habit=self.habit_2, title='Break The Habit').count() == 1
@@ -0,0 +1,157 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+from habit.db.backends.sqlite3.base import DatabaseWrapper
+from habit.db.pool import ConnectionPool, PoolTimeout, close_pools, get_pool, pool_stats
+
+
+class FakeConnection:
+    """A DB-API connection stand-in recording whether it was closed."""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    """Test cases for ConnectionPool."""
+
+    def test_reuses_returned_connections(self):
+        pool = ConnectionPool(size=2)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        assert pool.acquire(FakeConnection) is first
+        stats = pool.stats()
+        assert stats['created'] == 1
+        assert stats['checkouts'] == 2
+        assert stats['in_use'] == 1 and stats['idle'] == 0
+
+    def test_waits_then_times_out_when_full(self):
+        pool = ConnectionPool(size=1, timeout=0.05)
+        pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        stats = pool.stats()
+        assert stats['waits'] == 1 and stats['timeouts'] == 1
+        assert stats['max_wait_ms'] >= 50
+
+    def test_waiting_checkout_gets_released_connection(self):
+        pool = ConnectionPool(size=1, timeout=5)
+        held = pool.acquire(FakeConnection)
+        timer = threading.Timer(0.05, pool.release, [held])
+        timer.start()
+        try:
+            assert pool.acquire(FakeConnection) is held
+        finally:
+            timer.join()
+        assert pool.stats()['waits'] == 1
+        assert pool.stats()['created'] == 1
+
+    def test_health_check_failure_replaces_connection(self):
+        pool = ConnectionPool(size=1)
+        broken = pool.acquire(FakeConnection)
+        pool.release(broken)
+
+        def check(connection):
+            raise RuntimeError('gone away')
+
+        replacement = pool.acquire(FakeConnection, check=check)
+        assert replacement is not broken
+        assert broken.closed
+        stats = pool.stats()
+        assert stats['health_check_failures'] == 1
+        assert stats['open'] == 1
+
+    def test_reaps_idle_connections(self):
+        pool = ConnectionPool(size=2, max_idle=10)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        assert pool.reap() == 0
+        with mock.patch('habit.db.pool.time.monotonic', return_value=10 ** 9):
+            assert pool.reap() == 1
+        assert connection.closed
+        assert pool.stats()['reaped'] == 1
+        assert pool.stats()['open'] == 0
+
+    def test_reaper_closes_idle_connections_in_background(self):
+        pool = ConnectionPool(size=2, max_idle=0.01, reap_interval=0.01)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        reaper = pool.start_reaper()
+        try:
+            assert pool.start_reaper() is reaper
+            deadline = time.monotonic() + 5
+            while not connection.closed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert connection.closed
+            assert pool.stats()['reaped'] == 1
+        finally:
+            pool.close()
+        reaper.join(timeout=5)
+        assert not reaper.is_alive()
+        assert ConnectionPool(reap_interval=None).start_reaper() is None
+
+    def test_discards_connections_on_error(self):
+        pool = ConnectionPool(size=1)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection, discard=True)
+        assert connection.closed
+        assert pool.stats()['closed'] == 1
+
+
+class PooledBackendTestCase(TestCase):
+    """Test cases for the pooled SQLite backend."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(close_pools)
+        self.settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'habit.db.backends.sqlite3',
+            'NAME': os.path.join(directory.name, 'pool.sqlite3'),
+            'POOL': {'SIZE': 2},
+        }
+
+    def wrapper(self):
+        wrapper = DatabaseWrapper(self.settings_dict, alias='pooled')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_connection_returns_to_pool_on_close(self):
+        wrapper = self.wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id integer)')
+        raw = wrapper.connection
+        wrapper.close()
+
+        other = self.wrapper()
+        with other.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+        assert other.connection is raw
+        stats = pool_stats()['pooled']
+        assert stats['created'] == 1 and stats['checkouts'] == 2
+        pool = get_pool('pooled', self.settings_dict)
+        assert pool.size == 2
+        # The pool is reaped in the background from its creation
+        assert pool._reaper.is_alive()
+
+    def test_uncommitted_work_is_rolled_back(self):
+        wrapper = self.wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id integer)')
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (1)')
+        wrapper.close()
+
+        other = self.wrapper()
+        with other.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            assert cursor.fetchone() == (0,)
@@ -0,0 +1,64 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from habit.profiling import _profiling, categorize, collapsed_stacks, load_profiles
+
+
+class ProfilingTestCase(TestCase):
+    """Test cases for the sampling profiler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = User.objects.create_user(username='test_user_1', password='123456',
+                                            first_name='test', last_name='user')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.client.force_login(self.user)
+
+    def test_sampling_off_writes_nothing(self):
+        with override_settings(HABIT_PROFILE_SAMPLE_RATE=0, HABIT_PROFILE_DIR=self.directory.name):
+            self.client.get(reverse('active_habits'))
+        assert not any(Path(self.directory.name).iterdir())
+
+    def test_profiles_and_report(self):
+        with override_settings(HABIT_PROFILE_SAMPLE_RATE=1, HABIT_PROFILE_DIR=self.directory.name):
+            self.client.get(reverse('active_habits'))
+            self.client.get(reverse('active_habits'))
+
+        profiles = load_profiles(self.directory.name)
+        assert list(profiles) == ['active_habits']
+        count, stats = profiles['active_habits']
+        assert count == 2
+        assert collapsed_stacks(stats)
+
+        out = StringIO()
+        call_command('profile_report', dir=self.directory.name, top=0, stdout=out)
+        report = out.getvalue()
+        assert report.startswith('active_habits: 2 request(s)')
+        assert 'orm' in report and 'template' in report
+
+    def test_one_request_profiled_at_a_time(self):
+        with override_settings(HABIT_PROFILE_SAMPLE_RATE=1, HABIT_PROFILE_DIR=self.directory.name):
+            # Another request is being profiled
+            with _profiling:
+                response = self.client.get(reverse('active_habits'))
+            assert response.status_code == 200
+            assert load_profiles(self.directory.name) == {}
+
+            self.client.get(reverse('active_habits'))
+        assert load_profiles(self.directory.name)['active_habits'][0] == 1
+
+    def test_categorize(self):
+        assert categorize('/site-packages/django/db/models/query.py') == 'orm'
+        assert categorize('/site-packages/django/template/base.py') == 'template'
+        assert categorize('/site-packages/numpy/core/fromnumeric.py') == 'numpy'
+        assert categorize('/root/package/habit/signals.py') == 'signals'
+        assert categorize('/root/package/habit/analytics.py') == 'app'
+        assert categorize('~') == 'other'
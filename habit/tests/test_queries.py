@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+from habit.analytics import refresh_habit_rankings
+from habit.benchmark import generate_dataset
+from habit.cache import get_backend
+from habit.models import Habit, Streak, TaskTracker
+from habit.queries import QueryRecorder, assert_query_budget
+
+
+class QueryBudgetTestCase(TestCase):
+    """Test that the views stay within their query budgets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = generate_dataset(1, 6, seed=2)[0]
+        cls.habit = Habit.objects.filter(user=cls.user).first()
+
+    def setUp(self):
+        get_backend().clear()
+        self.client.force_login(self.user)
+
+    def test_habit_home_budget(self):
+        with assert_query_budget('habit-home'):
+            self.client.get(reverse('habit-home'))
+        # Completing a task posts to the home page
+        task = TaskTracker.objects.filter(habit=self.habit, task_status='In progress').first()
+        with assert_query_budget('habit-home'):
+            self.client.post(reverse('habit-home'), {'task_id': task.id, 'habit_id': self.habit.id})
+        assert TaskTracker.objects.get(pk=task.pk).task_status == 'Completed'
+
+    def test_active_habits_budget(self):
+        with assert_query_budget('active_habits'):
+            self.client.get(reverse('active_habits'))
+
+    def test_habit_detail_budget(self):
+        with assert_query_budget('habit_detail'):
+            self.client.get(reverse('habit_detail', args=[self.habit.id]))
+
+    def test_analysis_budget(self):
+        # The budget covers the steady state, once the rankings have been computed
+        refresh_habit_rankings()
+        with assert_query_budget('HabitsAnalysis'):
+            self.client.get(reverse('HabitsAnalysis'))
+
+    def test_journal_export_budget(self):
+        with assert_query_budget('journal_export'):
+            response = self.client.get(reverse('journal_export', kwargs={
+                'table': 'journal', 'export_format': 'ndjson'}))
+            b''.join(response.streaming_content)
+
+    def test_habit_creation_budget(self):
+        with assert_query_budget('habit_creation'):
+            self.client.get(reverse('habit_creation'))
+        with assert_query_budget('habit_creation'):
+            response = self.client.post(reverse('habit_creation'), {
+                'name': 'Budget', 'frequency': 1, 'period': 'daily', 'goal': '1 month',
+                'notes': '', 'start_date': timezone.now().strftime('%Y-%m-%dT%H:%M')})
+        assert response.status_code == 302
+
+    def test_habit_deletion_budget(self):
+        with assert_query_budget('habit_deletion'):
+            self.client.get(reverse('habit_deletion', args=[self.habit.id]))
+        with assert_query_budget('habit_deletion'):
+            self.client.post(reverse('habit_deletion', args=[self.habit.id]))
+        assert not Habit.objects.filter(pk=self.habit.pk).exists()
+
+    def test_users_views_budgets(self):
+        with assert_query_budget('profile'):
+            self.client.get(reverse('profile'))
+        with assert_query_budget('logout'):
+            self.client.post(reverse('logout'))
+
+        self.user.set_password('pw-123456')
+        self.user.save()
+        with assert_query_budget('login'):
+            self.client.get(reverse('login'))
+        with assert_query_budget('login'):
+            response = self.client.post(reverse('login'), {'username': self.user.username,
+                                                           'password': 'pw-123456'})
+        assert response.status_code == 302
+
+        self.client.logout()
+        with assert_query_budget('register'):
+            self.client.get(reverse('register'))
+        with assert_query_budget('register'):
+            response = self.client.post(reverse('register'), {
+                'username': 'new_user', 'email': 'new_user@example.com',
+                'password1': 'Xy!93kdlsPq', 'password2': 'Xy!93kdlsPq'})
+        assert response.status_code == 302
+
+    def test_every_view_has_a_budget(self):
+        names = {pattern.name for pattern in get_resolver().url_patterns
+                 if isinstance(pattern, URLPattern) and pattern.name}
+        assert names - set(settings.HABIT_QUERY_BUDGETS) == set()
+
+    def test_budget_overrun_fails(self):
+        with self.assertRaisesMessage(AssertionError, 'Duplicated queries'):
+            with assert_query_budget('active_habits', {'duplicates': 0}):
+                for habit in Habit.objects.filter(user=self.user):
+                    habit.streak.first()
+
+    def test_recorder_shapes(self):
+        with QueryRecorder() as recorder:
+            list(Streak.objects.filter(habit_id__in=[1, 2]))
+            list(Streak.objects.filter(habit_id__in=[1, 2, 3]))
+            list(Habit.objects.all())
+        assert recorder.count == 3
+        assert list(recorder.duplicates().values()) == [2]
+
+    @override_settings(DEBUG=True, HABIT_QUERY_INSTRUMENTATION=True)
+    def test_middleware_reports_queries(self):
+        with self.assertLogs('habit.queries', 'INFO') as logs:
+            response = self.client.get(reverse('active_habits'))
+        assert int(response['X-Habit-Queries']) > 0
+        assert 'GET active_habits' in logs.output[0]
+
+    def test_middleware_disabled(self):
+        response = self.client.get(reverse('active_habits'))
+        assert 'X-Habit-Queries' not in response
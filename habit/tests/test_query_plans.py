@@ -0,0 +1,107 @@
+import json
+import re
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from habit.models import Habit, TaskTracker, Streak
+from habit.analytics import due_today_tasks, active_tasks, upcoming_tasks
+
+
+def _mysql_tables(queryset, table):
+    """
+    Return the nodes of the MySQL JSON plan of a queryset reading ``table``.
+    """
+    plan = json.loads(queryset.explain(format='json'))
+    nodes = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get('table_name') == table:
+                nodes.append(node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return nodes
+
+
+def full_table_scans(queryset, table):
+    """
+    Return the EXPLAIN lines showing a scan of ``table`` for a queryset.
+
+    A scan walking an index is reported too: it still reads every row of the
+    table, only in index order.
+    """
+    if connection.vendor == 'mysql':
+        return [node for node in _mysql_tables(queryset, table)
+                if node.get('access_type') in ('ALL', 'index')]
+    return [line for line in queryset.explain().splitlines()
+            if re.search(rf'\bSCAN {table}\b', line)]
+
+
+def index_searches(queryset, table):
+    """
+    Return the EXPLAIN lines showing a search of ``table`` through an index for a queryset.
+    """
+    if connection.vendor == 'mysql':
+        return [node for node in _mysql_tables(queryset, table)
+                if node.get('access_type') in ('const', 'eq_ref', 'ref', 'range')]
+    return [line for line in queryset.explain().splitlines()
+            if re.search(rf'\bSEARCH {table} USING (COVERING )?INDEX\b', line)]
+
+
+@skipUnless(connection.vendor in ('sqlite', 'mysql'), 'Query plans are checked on SQLite and MySQL')
+class TaskQueryPlanTestCase(TestCase):
+    """Test that the hot TaskTracker queries are served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user_1 = User.objects.create_user(username='test_user_1', password='123456')
+        cls.habit = Habit.objects.create(name='Exercise', frequency=2, period='daily', goal=30,
+                                         num_of_tasks=0, notes='', start_date=timezone.now(),
+                                         user=cls.user_1)
+        TaskTracker.create_tasks(cls.habit)
+
+    def assert_uses_index(self, queryset):
+        table = TaskTracker._meta.db_table
+        scans = full_table_scans(queryset, table)
+        assert not scans, f'Full scan of {table}: {scans}'
+        assert index_searches(queryset, table), f'No index search of {table}'
+
+    def test_due_today_tasks_plan(self):
+        self.assert_uses_index(due_today_tasks(self.user_1.id))
+
+    def test_active_tasks_plan(self):
+        self.assert_uses_index(active_tasks(self.user_1.id))
+
+    def test_upcoming_tasks_plan(self):
+        self.assert_uses_index(upcoming_tasks(self.user_1.id))
+
+    def test_overdue_sweep_plan(self):
+        overdue = TaskTracker.objects.filter(user_id__in=[self.user_1.id],
+                                             due_date__lt=timezone.now(),
+                                             task_status='In progress')
+        self.assert_uses_index(overdue)
+
+    def test_all_users_overdue_plan(self):
+        overdue = TaskTracker.objects.filter(due_date__lt=timezone.now(),
+                                             task_status='In progress')
+        self.assert_uses_index(overdue)
+
+    def test_leaderboard_plan(self):
+        # Without a filter there is nothing to search: the top of the ranking
+        # is read by walking the rank index, and never sorted
+        for field, index in (('current_streak', 'streak_current_rank_idx'),
+                             ('longest_streak', 'streak_longest_rank_idx')):
+            top = Streak.objects.order_by(f'-{field}', 'habit_id')[:10]
+            if connection.vendor == 'mysql':
+                plan = top.explain(format='json')
+                assert f'"key": "{index}"' in plan
+                assert 'using_filesort' not in plan
+            else:
+                plan = top.explain()
+                assert f'USING INDEX {index}' in plan
+                assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,97 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from habit.analytics import all_completed_habits, longest_streak_over_all_habits, rank_habits, \
+    RANKING_PROFILES
+from habit.models import Habit, TaskTracker
+from habit.queries import QueryRecorder
+from habit.routers import AnalyticsReplicaRouter, analytics_database, analytics_reads
+
+
+@override_settings(HABIT_ANALYTICS_REPLICA='replica')
+class AnalyticsReplicaTestCase(TransactionTestCase):
+    """
+    Test cases for the analytics replica routing.
+
+    The replica is a second connection to the test database, as a test mirror would be,
+    so the tests can tell which connection served each query.
+    """
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings['replica'] = {**connections['default'].settings_dict}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test_user_1', password='123456',
+                                             first_name='test', last_name='user')
+        self.habit = Habit.objects.create(name='Habit', frequency=1, period='daily', goal=7,
+                                          notes='', start_date=timezone.now(), user=self.user)
+        TaskTracker.create_tasks(self.habit)
+
+    def record(self, read):
+        with QueryRecorder(using='default') as primary, QueryRecorder(using='replica') as replica:
+            read()
+        return primary.count, replica.count
+
+    def test_analytics_reads_use_replica(self):
+        for read in (lambda: longest_streak_over_all_habits(self.user.id),
+                     lambda: list(all_completed_habits(self.user.id)),
+                     lambda: rank_habits(RANKING_PROFILES['struggled_most'], 'daily')):
+            primary, replica = self.record(read)
+            assert primary == 0
+            assert replica > 0
+
+    def test_other_reads_use_primary(self):
+        primary, replica = self.record(lambda: list(Habit.objects.all()))
+        assert (primary, replica) == (1, 0)
+        with analytics_reads() as database:
+            assert database == 'replica'
+            primary, replica = self.record(lambda: list(Habit.objects.all()))
+        assert (primary, replica) == (0, 1)
+
+    def test_completion_pins_user_to_primary(self):
+        other = User.objects.create_user(username='test_user_2', password='123456')
+        task = TaskTracker.objects.filter(habit=self.habit).first()
+        TaskTracker.complete_task(task.id, self.habit.id, self.user.id)
+
+        assert analytics_database(self.user.id) is None
+        assert analytics_database(other.id) == 'replica'
+        # Reads spanning every user are never pinned
+        assert analytics_database() == 'replica'
+        primary, replica = self.record(lambda: longest_streak_over_all_habits(self.user.id))
+        assert primary > 0
+        assert replica == 0
+
+    def test_analysis_post_uses_replica(self):
+        self.client.force_login(self.user)
+        with QueryRecorder(using='replica') as replica:
+            response = self.client.post(reverse('HabitsAnalysis'),
+                                        {'selectedValue': self.habit.id})
+        assert response.status_code == 200
+        assert response.json()['streak'][0]['habit_id'] == self.habit.id
+        assert replica.count > 0
+
+    def test_no_replica_reads_primary(self):
+        with override_settings(HABIT_ANALYTICS_REPLICA=None):
+            assert analytics_database(self.user.id) is None
+            primary, replica = self.record(lambda: longest_streak_over_all_habits(self.user.id))
+        assert primary > 0
+        assert replica == 0
+
+    def test_replica_is_never_migrated(self):
+        router = AnalyticsReplicaRouter()
+        assert router.allow_migrate('replica', 'habit') is False
+        assert router.allow_migrate('default', 'habit') is None
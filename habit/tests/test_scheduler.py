@@ -0,0 +1,37 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from habit import scheduler
+from habit.scheduler import PeriodicJob
+
+
+class PeriodicJobTestCase(SimpleTestCase):
+    """Test cases for the in-process scheduler."""
+
+    def test_job_survives_failed_runs(self):
+        runs = []
+        done = threading.Event()
+
+        def job():
+            runs.append(1)
+            if len(runs) == 3:
+                done.set()
+            raise RuntimeError('boom')
+
+        thread = PeriodicJob(job, 0.01)
+        with self.assertLogs('habit.scheduler', 'ERROR') as logs, \
+                mock.patch('habit.scheduler.close_old_connections'):
+            thread.start()
+            assert done.wait(5)
+            thread.stop()
+            thread.join(5)
+        assert len(runs) >= 3
+        assert 'boom' in logs.output[0]
+
+    @override_settings(HABIT_SWEEP_IN_PROCESS=True, HABIT_RANKING_REFRESH_INTERVAL=None)
+    def test_background_jobs_start_once(self):
+        with mock.patch.object(scheduler, '_jobs', None), \
+                mock.patch.object(scheduler, 'start_sweeper') as start_sweeper:
+            jobs = scheduler.start_background_jobs()
+            assert scheduler.start_background_jobs() is jobs
+        start_sweeper.assert_called_once_with()
@@ -0,0 +1,60 @@
+from io import StringIO
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from habit.models import Habit, TaskTracker, Streak
+from habit.streaks import rebuild_streaks, streak_metrics
+
+
+class StreakEngineTestCase(TestCase):
+    """Test cases for the vectorized streak engine."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user_1 = User.objects.create_user(username='test_user_1', password='123456')
+        cls.habit = Habit.objects.create(name='Exercise', frequency=1, period='daily', goal=12,
+                                         num_of_tasks=0, notes='', start_date=timezone.now(),
+                                         user=cls.user_1)
+        TaskTracker.create_tasks(cls.habit)
+
+    def test_streak_metrics(self):
+        """Test run-length encoded metrics over several habits."""
+        habit_ids = np.array([1, 1, 1, 1, 1, 1, 2, 2, 2, 3])
+        completed = np.array([True, True, False, True, True, True, True, True, False, False])
+        metrics = streak_metrics(habit_ids, completed)
+
+        assert metrics['habit_id'].tolist() == [1, 2, 3]
+        assert metrics['num_of_completed_tasks'].tolist() == [5, 2, 0]
+        assert metrics['num_of_failed_tasks'].tolist() == [1, 1, 1]
+        assert metrics['longest_streak'].tolist() == [3, 2, 0]
+        assert metrics['current_streak'].tolist() == [3, 0, 0]
+
+    def test_rebuild_streaks_command(self):
+        """Test that drifted counters are recomputed from the task history."""
+        statuses = ['Completed'] * 7 + ['Failed'] * 2 + ['Completed'] * 2
+        for task_number, status in enumerate(statuses, start=1):
+            TaskTracker.objects.filter(habit=self.habit, task_number=task_number).update(task_status=status)
+        Streak.objects.filter(habit=self.habit).update(num_of_completed_tasks=42, current_streak=9)
+
+        call_command('rebuild_streaks', chunk_size=1, stdout=StringIO())
+
+        streak = Streak.objects.get(habit=self.habit)
+        assert streak.num_of_completed_tasks == 9
+        assert streak.num_of_failed_tasks == 2
+        assert streak.longest_streak == 7
+        assert streak.current_streak == 2
+
+    @skipUnless(connection.features.has_select_for_update, 'Rows are only locked where supported')
+    def test_rebuild_locks_streaks_before_reading_tasks(self):
+        with CaptureQueriesContext(connection) as queries:
+            rebuild_streaks([self.habit.id])
+        statements = [query['sql'] for query in queries.captured_queries]
+        locked = next(i for i, sql in enumerate(statements) if 'FOR UPDATE' in sql)
+        read = next(i for i, sql in enumerate(statements) if 'habit_tasktracker' in sql)
+        assert 'habit_streak' in statements[locked] and locked < read
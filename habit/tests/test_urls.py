@@ -28,3 +28,8 @@ class TestUrls:
     def test_habit_manager_url(self):
         path = reverse('active_habits')
         assert resolve(path).func.__name__ == 'active_habits'
+
+    def test_journal_export_url(self):
+        path = reverse('journal_export', kwargs={'table': 'tasks', 'export_format': 'csv'})
+        assert path == '/export/tasks.csv'
+        assert resolve(path).func.view_class == habit_views.JournalExportView
@@ -3,7 +3,8 @@ from django.test import RequestFactory
 from django.contrib.auth.models import User, AnonymousUser
 from django.urls import reverse
 from habit.views import HabitManagerView, HabitView
-from habit.models import Habit, TaskTracker, Streak
+from habit.models import Habit, TaskTracker, Streak, Achievement
+from habit.queries import assert_query_budget
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.test import TestCase
@@ -69,3 +70,97 @@ class ViewTestCase(TestCase):
         assert streak.longest_streak == 1
         assert response.status_code == 302
         assert response.url == '/'
+
+    def test_mark_task_completed_is_atomic(self):
+        task = TaskTracker.objects.create(habit=self.habit, task_number=1, task_status='In progress')
+        request = self.factory.post('/habit-home', {'task_id': task.id, 'habit_id': self.habit.id})
+        request.user = self.user
+
+        with self.assertNumQueries(5):
+            HabitView.as_view()(request)
+        # A retried request does not complete the task twice
+        HabitView.as_view()(request)
+
+        streak = Streak.objects.get(habit=self.habit)
+        assert streak.current_streak == 1
+        assert streak.num_of_completed_tasks == 1
+        assert streak.longest_streak == 1
+
+    def test_mark_task_completed_other_user(self):
+        other_user = User.objects.create_user(username='test_user_2', password='123456')
+        task = TaskTracker.objects.create(habit=self.habit, task_number=1, task_status='In progress')
+        request = self.factory.post('/habit-home', {'task_id': task.id, 'habit_id': self.habit.id})
+        request.user = other_user
+        HabitView.as_view()(request)
+
+        assert TaskTracker.objects.get(id=task.id).task_status == 'In progress'
+        assert Streak.objects.get(habit=self.habit).current_streak == 0
+
+    def test_habit_detail_annotations(self):
+        TaskTracker.objects.create(habit=self.habit, task_number=1, task_status='Completed')
+        TaskTracker.objects.create(habit=self.habit, task_number=2, task_status='In progress')
+        TaskTracker.objects.create(habit=self.habit, task_number=3, task_status='In progress')
+        Streak.objects.filter(habit=self.habit).update(num_of_completed_tasks=1, current_streak=1)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('habit_detail', args=[self.habit.pk]))
+        habit = response.context['habit']
+        assert habit.in_progress == 2
+        assert habit.num_of_completed_tasks == 1
+        assert habit.current_streak == 1
+
+    def test_habit_detail_lists_achievements(self):
+        Achievement.objects.create(habit=self.habit, streak_length=7, title='7-Day Streak',
+                                   date=timezone.now())
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('habit_detail', args=[self.habit.pk]))
+        self.assertContains(response, '<td>7-Day Streak</td>', html=True)
+
+    def test_complete_tasks_in_bulk(self):
+        other_user = User.objects.create_user(username='test_user_2', password='123456')
+        other_habit = Habit.objects.create(user=other_user, name='Other Habit', frequency=1,
+                                           period='daily', goal=7, notes='', start_date=timezone.now())
+        tasks = [TaskTracker.objects.create(habit=self.habit, task_number=i) for i in range(1, 4)]
+        other_task = TaskTracker.objects.create(habit=other_habit, task_number=1)
+        Streak.objects.filter(habit=self.habit).update(current_streak=5, longest_streak=5)
+        self.client.force_login(self.user)
+
+        with assert_query_budget('complete_tasks'):
+            response = self.client.post(
+                reverse('complete_tasks'),
+                {'task_ids': [task.id for task in tasks] + [other_task.id]},
+                content_type='application/json')
+
+        data = response.json()
+        assert data['completed'] == [task.id for task in tasks]
+        assert data['streaks'] == [{'habit_id': self.habit.id, 'current_streak': 8,
+                                    'longest_streak': 8, 'num_of_completed_tasks': 3,
+                                    'num_of_failed_tasks': 0}]
+        # The milestone crossed on the way to 8 is rewarded
+        assert data['achievements'] == [{'habit_id': self.habit.id, 'title': '7-Day Streak',
+                                         'streak_length': 7}]
+        assert TaskTracker.objects.get(id=other_task.id).task_status != 'Completed'
+
+        # Completing the same tasks again is a no-op
+        response = self.client.post(reverse('complete_tasks'), {'task_ids': [tasks[0].id]},
+                                    content_type='application/json')
+        assert response.json()['completed'] == []
+        assert Achievement.objects.filter(habit=self.habit).count() == 1
+
+    def test_complete_tasks_rejects_invalid_ids(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('complete_tasks'), {'task_ids': ['x']},
+                                    content_type='application/json')
+        assert response.status_code == 400
+        task = TaskTracker.objects.create(habit=self.habit, task_number=1)
+        for task_ids in (str(task.id), [True], task.id):
+            response = self.client.post(reverse('complete_tasks'), {'task_ids': task_ids},
+                                        content_type='application/json')
+            assert response.status_code == 400
+        task.refresh_from_db()
+        assert task.task_status != 'Completed'
+        self.client.logout()
+        response = self.client.post(reverse('complete_tasks'), {'task_ids': [1]},
+                                    content_type='application/json')
+        assert response.status_code == 401
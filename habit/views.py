@@ -1,19 +1,20 @@
 import json
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
-from django.utils import timezone
 from django.core import serializers
 from django.contrib import messages
-from django.contrib.auth.models import User
+from .cache import cached_for_user
+from .export import EXPORT_FORMATS, export_journal
 from .forms import HabitForm
-from .models import TaskTracker, Habit, Streak, Achievement
+from .models import TaskTracker, Habit, Achievement
+from .routers import analytics_reads
 from .analytics import (
     due_today_tasks, active_tasks, upcoming_tasks,
-    calculate_progress, longest_current_streak_over_all_habits,
-    all_tracked_habits, habits_by_period,
-    longest_streak_over_all_habits, num_inprogress_tasks,
-    update_user_activity, rank_habits, all_completed_habits
+    active_habits_by_period, annotate_progress,
+    update_user_activity, analysis_summary,
+    note_streak_changes
 )
 
 class HabitView(View):
@@ -49,11 +50,15 @@ class HabitView(View):
             The HTTP response.
         """
         user_id = request.user.id
-        update_user_activity(user_id)
-        today_tasks = due_today_tasks(user_id=user_id)
-        active_task = active_tasks(user_id=user_id)
-        upcoming_task = upcoming_tasks(user_id=user_id)
-        user_full_name = User.objects.get(id=user_id).get_full_name().split()[0].capitalize()
+        # Overdue tasks are normally failed by the background sweeper;
+        # the on-request sweep is kept while it is being rolled out.
+        if getattr(settings, 'HABIT_SWEEP_ON_REQUEST', True):
+            update_user_activity(user_id)
+        # The cards show each task's habit, so fetch it with the task
+        today_tasks = due_today_tasks(user_id=user_id).select_related('habit')
+        active_task = active_tasks(user_id=user_id).select_related('habit')
+        upcoming_task = upcoming_tasks(user_id=user_id).select_related('habit')
+        user_full_name = request.user.get_full_name().split()[0].capitalize()
 
         context = {
             'upcoming_tasks': upcoming_task,
@@ -79,37 +84,138 @@ class HabitView(View):
             The HTTP response.
         """
 
-        task_id = request.POST.get('task_id')
-        habit_id = request.POST.get('habit_id')
+        try:
+            task_id = int(request.POST.get('task_id'))
+            habit_id = int(request.POST.get('habit_id'))
+        except (TypeError, ValueError):
+            return redirect('habit-home')
 
-        task = get_object_or_404(TaskTracker, id=task_id)
-        habit = get_object_or_404(Habit, id=habit_id)
-        streak = get_object_or_404(Streak, habit_id=habit_id)
+        # Complete the task and update the streak and achievements atomically;
+        # completing an already completed task is a no-op
+        streak = TaskTracker.complete_task(task_id, habit_id, request.user.id)
+        if streak:
+            note_streak_changes()
 
-        try:
-            # Update Task table
-            task.task_status = 'Completed'
-            task.task_completion_date = timezone.now()
-            task.save()
+        return redirect('habit-home')
 
-            # Update streak and number of completed tasks in Streak and Habit tables
-            if task.task_status == 'Completed':
-                streak.current_streak += 1
-                streak.num_of_completed_tasks += 1
-                Achievement.rewards_streaks(habit_id, streak)
 
-                habit.save()
-                streak.save()
 
-                # messages.success(request, f' {habit.name} Task marked as done')
+class TaskCompletionView(View):
+    """
+    JSON endpoint completing several tasks at once.
 
-                return redirect('habit-home')
+    Methods
+    -------
+    post(request, *args, **kwargs)
+        Handles POST requests completing a list of tasks.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        return super().dispatch(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Handles POST requests completing a list of tasks.
 
-        except TaskTracker.DoesNotExist:
-            pass
+        The task IDs are read from a JSON body ``{"task_ids": [...]}``, or from
+        repeated ``task_ids`` form fields. Tasks that do not belong to the user
+        or are already resolved are ignored.
 
-        # If an error occurs or the task is not found, redirect to habit home page
-        return redirect('habit-home')
+        Parameters
+        ----------
+        request : HttpRequest
+            The HTTP request.
+
+        Returns
+        -------
+        JsonResponse
+            The IDs of the completed tasks, the updated streak counters of their
+            habits and the achievements earned, or an error with status 400.
+        """
+        try:
+            if request.content_type == 'application/json':
+                task_ids = json.loads(request.body)['task_ids']
+                # Only a list of integers; int() would also accept strings and booleans
+                if not isinstance(task_ids, list) or not all(
+                        isinstance(task_id, int) and not isinstance(task_id, bool)
+                        for task_id in task_ids):
+                    raise TypeError
+            else:
+                task_ids = [int(task_id) for task_id in request.POST.getlist('task_ids')]
+        except (ValueError, TypeError, KeyError):
+            return JsonResponse({'error': 'task_ids must be a list of task IDs.'}, status=400)
+
+        limit = getattr(settings, 'HABIT_BULK_COMPLETION_LIMIT', 100)
+        if len(task_ids) > limit:
+            return JsonResponse({'error': f'At most {limit} tasks can be completed at once.'},
+                                status=400)
+
+        completed, streaks, achievements = TaskTracker.complete_tasks(request.user.id, task_ids)
+        if streaks:
+            note_streak_changes(len(streaks))
+
+        return JsonResponse({
+            'completed': completed,
+            'streaks': [{
+                'habit_id': streak.habit_id,
+                'current_streak': streak.current_streak,
+                'longest_streak': streak.longest_streak,
+                'num_of_completed_tasks': streak.num_of_completed_tasks,
+                'num_of_failed_tasks': streak.num_of_failed_tasks,
+            } for streak in streaks],
+            'achievements': [{
+                'habit_id': achievement.habit_id,
+                'title': achievement.title,
+                'streak_length': achievement.streak_length,
+            } for achievement in achievements],
+        })
+
+
+class JournalExportView(View):
+    """
+    Streaming download of the user's habits, tasks, streaks and achievements.
+
+    Methods
+    -------
+    get(request, table, export_format)
+        Handles GET requests streaming an export.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('login')
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request, table, export_format):
+        """
+        Handles GET requests streaming an export.
+
+        Parameters
+        ----------
+        request : HttpRequest
+            The HTTP request.
+        table : str
+            The exported table, or 'journal' for every table.
+        export_format : str
+            'csv' or 'ndjson'.
+
+        Returns
+        -------
+        StreamingHttpResponse
+            The export, as an attachment.
+
+        Raises
+        ------
+        Http404
+            If the table or the format is not exported.
+        """
+        try:
+            chunks = export_journal(request.user.id, table, export_format)
+        except ValueError as error:
+            raise Http404(str(error))
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{table}.{export_format}"'
+        return response
 
 
 
@@ -273,28 +379,16 @@ class HabitManagerView(View):
         
         user_id = request.user.id
 
-        # Query all tracked habits with their longest streak and current streak
-        all_active_habits = all_tracked_habits(user_id=user_id)
-
-        # Filter tracked habits with the same periodicity
-        daily_habits = habits_by_period('daily')(all_active_habits)
-        weekly_habits = habits_by_period('weekly')(all_active_habits)
-        monthly_habits = habits_by_period('monthly')(all_active_habits)
-
-
-
-        # Calculate progress percentage for each active habit
+        # Query all tracked habits with their longest streak and current streak,
+        # partitioned by period with the progress percentage computed once per habit
         # based on (num_complted + num_failed)/num_of_tasks
-        calculate_progress(all_active_habits)
-        calculate_progress(daily_habits)
-        calculate_progress(weekly_habits)
-        calculate_progress(monthly_habits)
+        habits = active_habits_by_period(user_id)
 
         context = {
-            'active_habits': all_active_habits,
-            'daily_habits': daily_habits,
-            'weekly_habits': weekly_habits,
-            'monthly_habits': monthly_habits,
+            'active_habits': habits['all'],
+            'daily_habits': habits['daily'],
+            'weekly_habits': habits['weekly'],
+            'monthly_habits': habits['monthly'],
         }
         return render(request, 'habit_manager.html', context)
 
@@ -319,16 +413,14 @@ class HabitManagerView(View):
         if not request.user.is_authenticated:
             return redirect('login')
 
-        habit = get_object_or_404(Habit, pk=habit_id)
+        # The streak counters and the in-progress task count are annotated on the habit
+        habit = get_object_or_404(annotate_progress(Habit.objects.all()), pk=habit_id)
         tasks = TaskTracker.objects.filter(habit_id=habit_id)
-        streak = Streak.objects.get(habit_id=habit_id)
         achievement = Achievement.objects.filter(habit_id=habit_id)
-        num_inprogress_tasks(habit)
 
         context = {
             'habit': habit,
             'tasks': tasks,
-            'streak': streak,
             'achievement' : achievement
         }
 
@@ -377,49 +469,9 @@ class HabitAnalysis(View):
 
         user_id = request.user.id
 
-        # Retrieve all tracked habits and filter them by period
-        all_habits = all_tracked_habits(user_id=user_id)
-        daily_habits = habits_by_period('daily')(all_habits)
-        weekly_habits = habits_by_period('weekly')(all_habits)
-        monthly_habits = habits_by_period('monthly')(all_habits)
-
-        #retrieve completed habits
-        completed_habits = all_completed_habits(user_id)
-
-        # Retrieve the habit with the current longest streak
-        longest_current_all_streak = longest_current_streak_over_all_habits()
-        # Retrieve the habit with longest streak
-        longest_all_streak = longest_streak_over_all_habits()
-
-        weights = {
-            'completed_tasks': -0.2,
-            'failed_tasks': 0.8,
-            'longest_streak': -0.2,
-            'current_streak': -0.1
-        }
-
-        daily_struggled_most = rank_habits(weights, 'daily')
-        weekly_struggled_most = rank_habits(weights, 'weekly')
-
-        print(weekly_struggled_most)
-        calculate_progress(all_habits)
-        calculate_progress(daily_habits)
-        calculate_progress(weekly_habits)
-        calculate_progress(monthly_habits)
-        calculate_progress(longest_all_streak)
-        calculate_progress(longest_current_all_streak)
-
-        context = {
-            'all_habits': all_habits,
-            'daily_habits': daily_habits,
-            'weekly_habits': weekly_habits,
-            'monthly_habits': monthly_habits,
-            'daily_struggled_most' : daily_struggled_most,
-            'weekly_struggled_most' : weekly_struggled_most,
-            'longest_all_streak': longest_all_streak,
-            'longest_current_all_streak': longest_current_all_streak,
-            'completed_habits': completed_habits
-        }
+        # Served from the per-user analytics cache, recomputed after any change
+        # to the user's tasks or habits
+        context = cached_for_user(user_id, 'analysis', lambda: analysis_summary(user_id))
 
         return render(request, 'analysis.html', context)
 
@@ -449,16 +501,18 @@ class HabitAnalysis(View):
         """
         selected_value = request.POST.get('selectedValue')
 
-        # Retrieve the habit object with related streak using prefetch_related
-        habit = Habit.objects.prefetch_related('streak').get(id=selected_value)
+        # Read from the analytics database, pinned to the primary after a completion
+        with analytics_reads(request.user.id):
+            # Retrieve the habit object with related streak using prefetch_related
+            habit = Habit.objects.prefetch_related('streak').get(id=selected_value)
 
-        # Serialize the habit object along with related streak data
-        habit_data = serializers.serialize('json', [habit])
+            # Serialize the habit object along with related streak data
+            habit_data = serializers.serialize('json', [habit])
 
-        # Convert serialized data to Python dictionary
-        habit_dict = json.loads(habit_data)[0]['fields']
+            # Convert serialized data to Python dictionary
+            habit_dict = json.loads(habit_data)[0]['fields']
 
-        # Add streak data to habit dictionary
-        habit_dict['streak'] = list(habit.streak.values())
+            # Add streak data to habit dictionary
+            habit_dict['streak'] = list(habit.streak.values())
 
         return JsonResponse(habit_dict, safe=False)
@@ -24,3 +24,29 @@ DATABASES = {
         'PORT': '3306',
     }
 }
+
+# Pooled MySQL connections
+# The 'habit.db.backends.mysql' engine reuses connections across requests from a
+# per-process pool. Every key of 'POOL' is optional; these are the defaults.
+# Only the MySQL and SQLite engines are pooled; ODBC connections are pooled by
+# the ODBC driver manager. Other engines keep Django's CONN_MAX_AGE, 0 by default.
+
+# DATABASES['default']['ENGINE'] = 'habit.db.backends.mysql'
+# DATABASES['default']['POOL'] = {
+#     'SIZE': 10,             # Maximum open connections per process.
+#     'TIMEOUT': 5,           # Seconds a request waits for a free connection.
+#     'MAX_IDLE': 300,        # Seconds before an idle connection is closed.
+#     'MAX_LIFETIME': 3600,   # Seconds before any connection is closed.
+#     'HEALTH_CHECKS': True,  # Ping connections when they are checked out.
+#     'REAP_INTERVAL': 60,    # Seconds between two closings of expired connections.
+# }
+
+# Read replica for the analytics reads
+# Add the replica to DATABASES and set HABIT_ANALYTICS_REPLICA to its alias in
+# settings.py. Its TEST MIRROR makes the tests use the primary test database.
+
+# DATABASES['replica'] = {
+#     **DATABASES['default'],
+#     'HOST': 'replica.example.com',
+#     'TEST': {'MIRROR': 'default'},
+# }